@@ -0,0 +1,242 @@
+# benchmarks/fake_timestream.py
+# Offline stand-in for the `timestream-query` client. It understands the
+# queries produced by utils.queries (raw selects, bin()/GROUP BY aggregates,
+# max_by "latest" lookups) and answers them from synthetic minute-level
+# telemetry, split into NextToken pages shaped like real Timestream responses.
+import re
+import zlib
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+import config
+
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+_BYTES_PER_ROW = 64
+_METERED_MINIMUM = 10 * 1024 * 1024
+
+_SCALAR_TYPES = {
+    "est_time": "VARCHAR",
+    "fridge_id": "VARCHAR",
+    "region": "VARCHAR",
+    "time": "TIMESTAMP",
+    "door_usage": "BIGINT",
+    "door_max": "BIGINT",
+    "samples": "BIGINT",
+    "temp_count": "BIGINT",
+    "door_count": "BIGINT",
+}
+
+
+def _split_top_level(text, sep=","):
+    """Split on ``sep`` outside parentheses."""
+    parts, depth, current = [], 0, []
+    for ch in text:
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        if ch == sep and depth == 0:
+            parts.append("".join(current).strip())
+            current = []
+        else:
+            current.append(ch)
+    parts.append("".join(current).strip())
+    return parts
+
+
+def _duration_seconds(literal):
+    return int(literal[:-1]) * _UNITS[literal[-1]]
+
+
+class FakeTimestreamClient:
+    """
+    Synthetic telemetry for ``fridges`` sampled every ``interval_s`` seconds,
+    ending at ``now`` (UTC). Responses are memoized per query string so timed
+    repeats measure the client side only.
+    """
+
+    def __init__(self, fridges, now=None, interval_s=60, page_rows=1000, seed=7):
+        self.fridges = list(fridges)
+        self.now = now or datetime(2025, 1, 1, tzinfo=timezone.utc)
+        self.interval_s = interval_s
+        self.page_rows = page_rows
+        self.seed = seed
+        self.queries = []
+        self._responses = {}
+
+    # -- boto3 client surface -------------------------------------------------
+    def query(self, QueryString, NextToken=None, MaxRows=None):
+        self.queries.append(QueryString)
+        pages = self._responses.get(QueryString)
+        if pages is None:
+            result, scanned = self._execute(QueryString)
+            pages = self._paginate(result, scanned, MaxRows or self.page_rows)
+            self._responses[QueryString] = pages
+        return pages[int(NextToken or 0)]
+
+    def cancel_query(self, QueryId):
+        return {}
+
+    # -- synthetic data -------------------------------------------------------
+    def readings(self, fridge_id, start, end):
+        """Raw readings of one fridge with start <= time <= end (naive UTC)."""
+        step = pd.Timedelta(seconds=self.interval_s)
+        first = pd.Timestamp(start).ceil(step)
+        times = pd.date_range(first, pd.Timestamp(end), freq=step)
+        n = len(times)
+        rng = np.random.default_rng([self.seed, zlib.crc32(fridge_id.encode()), int(first.value // 10**9)])
+        seconds = times.asi8 // 10**9
+        temp = 38 + 3 * np.sin(2 * np.pi * seconds / 86400) + rng.normal(0, 0.5, n)
+        door = rng.poisson(0.3, n)
+        local = times.tz_localize("UTC").tz_convert(ZoneInfo(config.LOCAL_TIMEZONE)).tz_localize(None)
+        return pd.DataFrame({
+            "est_time": local.strftime("%m/%d/%Y, %I:%M:%S %p"),
+            "temp": np.round(temp, 2),
+            "door_usage": door,
+            "fridge_id": fridge_id,
+            "region": "richmond-va",
+            "time": times,
+        })
+
+    # -- query evaluation -----------------------------------------------------
+    def _time_window(self, query):
+        now = pd.Timestamp(self.now).tz_convert("UTC").tz_localize(None)
+        between = re.search(r"time BETWEEN from_milliseconds\((\d+)\) AND from_milliseconds\((\d+)\)", query)
+        if between:
+            start, end = (pd.Timestamp(int(ms), unit="ms") for ms in between.groups())
+            return start, min(end, now)
+        ago = re.search(r"time > ago\((\d+[smhd])\)", query)
+        if ago:
+            return now - timedelta(seconds=_duration_seconds(ago.group(1))), now
+        raise ValueError(f"Query has no time predicate: {query}")
+
+    def _fridge_ids(self, query):
+        single = re.search(r"fridge_id = '((?:[^']|'')*)'", query)
+        if single:
+            return [single.group(1).replace("''", "'")]
+        listed = re.search(r"fridge_id IN \(([^)]*)\)", query)
+        if listed:
+            return [v.strip().strip("'").replace("''", "'") for v in listed.group(1).split(",")]
+        return self.fridges
+
+    def _execute(self, query):
+        select = re.search(r"SELECT (.*) FROM ", query).group(1)
+        start, end = self._time_window(query)
+        frames = [self.readings(fid, start, end) for fid in self._fridge_ids(query)]
+        data = pd.concat(frames, ignore_index=True) if frames else self.readings("", start, start)
+
+        items = []
+        for item in _split_top_level(select):
+            expr, _, alias = item.partition(" AS ")
+            items.append((expr.strip(), (alias or expr).strip()))
+
+        group_match = re.search(r"GROUP BY (.*?)(?: ORDER BY | LIMIT |$)", query)
+        if group_match:
+            result = self._aggregate(data, items, _split_top_level(group_match.group(1)))
+        else:
+            result = data[[expr for expr, _ in items]].set_axis([a for _, a in items], axis=1)
+
+        if "ORDER BY" in query:
+            descending = re.search(r"ORDER BY \S+ DESC", query) is not None
+            sort_col = "time" if "time" in result.columns else result.columns[0]
+            result = result.sort_values(sort_col, ascending=not descending, kind="stable")
+        limit = re.search(r"LIMIT (\d+)", query)
+        if limit:
+            result = result.head(int(limit.group(1)))
+        # Scanned bytes follow the raw rows read, not the rows returned.
+        return result.reset_index(drop=True), len(data) * _BYTES_PER_ROW
+
+    def _aggregate(self, data, items, group_by):
+        keys = []
+        for expr in group_by:
+            binned = re.fullmatch(r"bin\(time, (\d+[smhd])\)", expr)
+            if binned:
+                seconds = _duration_seconds(binned.group(1))
+                data = data.assign(_bin=data["time"].dt.floor(f"{seconds}s"))
+                keys.append(("_bin", expr))
+            else:
+                keys.append((expr, expr))
+        grouped = data.groupby([k for k, _ in keys], sort=False)
+
+        out = {}
+        for expr, alias in items:
+            key = next((col for col, source in keys if source == expr), None)
+            if key is not None:
+                out[alias] = grouped[key].first()
+                continue
+            func, arg = re.fullmatch(r"(\w+)\((.*)\)", expr).groups()
+            if func == "count":
+                out[alias] = grouped.size()
+            elif func == "max_by":
+                column = _split_top_level(arg)[0]
+                newest = grouped["time"].idxmax()
+                out[alias] = data.loc[newest.values, column].set_axis(newest.index)
+            else:
+                out[alias] = grouped[arg].agg({"avg": "mean"}.get(func, func))
+        return pd.DataFrame(out).reset_index(drop=True)
+
+    # -- response shaping -----------------------------------------------------
+    def _column_info(self, df):
+        info = []
+        for name in df.columns:
+            scalar = _SCALAR_TYPES.get(name, "DOUBLE")
+            info.append({"Name": name, "Type": {"ScalarType": scalar}})
+        return info
+
+    def _cells(self, df):
+        columns = []
+        for name in df.columns:
+            series = df[name]
+            if pd.api.types.is_datetime64_any_dtype(series):
+                values = series.dt.strftime("%Y-%m-%d %H:%M:%S.000000000")
+            else:
+                values = series.astype(str)
+            values = values.where(series.notna(), None).tolist()
+            columns.append([{"NullValue": True} if v is None else {"ScalarValue": v} for v in values])
+        return [{"Data": list(cells)} for cells in zip(*columns)] if columns else []
+
+    def _paginate(self, df, scanned, page_rows):
+        column_info = self._column_info(df)
+        rows = self._cells(df)
+        chunks = [rows[i:i + page_rows] for i in range(0, len(rows), page_rows)] or [[]]
+        query_id = f"fake-{len(self._responses)}"
+        pages = []
+        for index, chunk in enumerate(chunks):
+            page = {
+                "QueryId": query_id,
+                "ColumnInfo": column_info,
+                "Rows": chunk,
+                "QueryStatus": {
+                    "ProgressPercentage": 100.0 * (index + 1) / len(chunks),
+                    "CumulativeBytesScanned": scanned,
+                    "CumulativeBytesMetered": max(scanned, _METERED_MINIMUM),
+                },
+            }
+            if index + 1 < len(chunks):
+                page["NextToken"] = str(index + 1)
+            pages.append(page)
+        return pages
+
+
+class FakeSession:
+    """Minimal boto3.Session stand-in handing out the fake client."""
+
+    def __init__(self, client, region_name="us-east-1"):
+        self._client = client
+        self.region_name = region_name
+
+    def client(self, service_name, **kwargs):
+        if service_name == "sts":
+            return _FakeSTS()
+        return self._client
+
+    def get_credentials(self):
+        return None
+
+
+class _FakeSTS:
+    def get_caller_identity(self):
+        return {"Account": "000000000000"}
@@ -0,0 +1,250 @@
+# benchmarks/run.py
+"""
+Offline benchmarks for the dashboard's hot paths.
+
+Runs against FakeTimestreamClient (no AWS access needed) and writes results as
+JSON so runs can be compared:
+
+    python -m benchmarks.run --sizes 1000 10000 100000 --output bench_results.json
+    python -m benchmarks.run --sizes 10000000 --only parse_query_result
+
+Sizes are row counts (minute-level readings of one fridge); fleet-wide cases
+use min(size, --max-fleet) fridges. Each timing is the best of --repeat runs
+after one warm-up run; synthetic responses are memoized, so timings cover the
+client side only.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from functools import cached_property
+
+import pandas as pd
+import plotly.express as px
+
+import config
+from benchmarks.fake_timestream import FakeTimestreamClient, FakeSession
+from components.map_view import build_status_table
+from utils import aws, store
+from utils.data import door_activity_heatmap
+from utils.downsample import downsample_figure, use_webgl
+from utils.queries import equals, from_epoch_ms, select_query, time_between
+from utils.registry import get_registry
+
+NOW = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def _configure(store_dir):
+    config.AWS_REGION = config.AWS_REGION_DEFAULT
+    config.DATABASE_NAME = config.DATABASE_NAME_DEFAULT
+    config.TABLE_NAME = config.TABLE_NAME_DEFAULT
+    config.LOCAL_STORE_PATH = os.path.join(store_dir, "telemetry.sqlite3")
+    config.FRIDGE_REGISTRY_PATH = os.path.join(store_dir, "fridges.csv")
+    # The fake generates every reading in the lookback; one hour is enough to
+    # exercise the latest-per-fridge path for large fleets.
+    config.LATEST_LOOKBACK_HOURS = 1
+    # Streamlit warns about running without a script context on every call.
+    logging.disable(logging.WARNING)
+
+
+def _use_fleet(size):
+    """Point the fridge registry at a CSV of ``size`` synthetic fridges."""
+    fridges = [f"bench-fridge-{i:06d}" for i in range(size)]
+    pd.DataFrame({
+        "number": range(size),
+        "fridge_id": fridges,
+        "address": [f"{i} Bench St, Richmond, VA" for i in range(size)],
+        "lat": [37.45 + (i % 100) * 0.002 for i in range(size)],
+        "lon": [-77.55 + (i // 100 % 100) * 0.002 for i in range(size)],
+    }).to_csv(config.FRIDGE_REGISTRY_PATH, index=False)
+    return fridges
+
+
+def _time(fn, repeat, setup=None):
+    """Best and median wall time of ``fn`` over ``repeat`` runs, after one warm-up."""
+    if setup:
+        setup()
+    fn()
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return min(samples), statistics.median(samples)
+
+
+def _clear_caches():
+    aws.query_timestream.clear()
+    aws.get_latest_data_for_all_fridges.clear()
+    aws.clear_history_cache()
+
+
+@contextmanager
+def _raw_history(size):
+    """Keep a whole ``size``-minute window raw so the store path handles every row."""
+    raw_hours = config.HISTORY_RAW_WINDOW_HOURS
+    config.HISTORY_RAW_WINDOW_HOURS = size / 60 + 1
+    try:
+        yield
+    finally:
+        config.HISTORY_RAW_WINDOW_HOURS = raw_hours
+
+
+class _Fixtures:
+    """Inputs shared by the cases of one size, each built on first use."""
+
+    fridge = "bench-fridge-000000"
+
+    def __init__(self, size, max_fleet):
+        self.size = size
+        self.max_fleet = max_fleet
+        self.end = from_epoch_ms(int(NOW.timestamp() * 1000))
+        self.start = self.end - timedelta(minutes=size - 1)
+
+    @cached_property
+    def client(self):
+        client = FakeTimestreamClient([self.fridge], now=NOW)
+        aws._boto3_session = None
+        aws.set_aws_session(FakeSession(client))
+        return client
+
+    @cached_property
+    def merged(self):
+        """Raw pages for one fridge, merged as query_timestream would return them."""
+        self.client
+        raw_query = select_query(
+            ["est_time", "temp", "door_usage", "fridge_id", "region", "time"],
+            time_between(self.start, self.end),
+            where=[equals("fridge_id", self.fridge)],
+        )
+        return aws._merge_pages(aws.iter_query_pages(raw_query))
+
+    @cached_property
+    def fleet(self):
+        fleet = _use_fleet(min(self.size, self.max_fleet))
+        self.client.fridges = fleet
+        return fleet
+
+    @cached_property
+    def registry(self):
+        self.fleet
+        return get_registry()
+
+    @cached_property
+    def latest(self):
+        self.fleet
+        return aws.get_latest_data_for_all_fridges()
+
+    def history(self):
+        self.client
+        return aws.get_historical_data_for_fridge(self.fridge, self.start, self.end)
+
+    def raw_history(self):
+        with _raw_history(self.size):
+            return self.history()
+
+    @cached_property
+    def hist(self):
+        return self.raw_history().sort_values("est_time_dt")
+
+
+def _reset_store(fx):
+    def reset():
+        _clear_caches()
+        store.clear(fx.fridge)
+    return reset
+
+
+# name -> factory(fixtures) returning (rows, fn, setup); nothing is built
+# until a case is picked.
+_CASES = {
+    "parse_query_result": lambda fx: (
+        fx.size, lambda merged=fx.merged: aws.parse_query_result(merged), None
+    ),
+    "get_latest_data_for_all_fridges": lambda fx: (
+        len(fx.fleet), aws.get_latest_data_for_all_fridges, _clear_caches
+    ),
+    "history_raw_cold": lambda fx: (fx.size, fx.raw_history, _reset_store(fx)),
+    "history_raw_warm": lambda fx: (fx.size, fx.raw_history, _clear_caches),
+    "history_binned": lambda fx: (fx.size, fx.history, _clear_caches),
+    "map_status_table": lambda fx: (
+        len(fx.fleet), lambda latest=fx.latest: build_status_table(latest), None
+    ),
+    "registry_within_radius": lambda fx: (
+        len(fx.fleet), lambda registry=fx.registry: registry.within_radius(37.5, -77.45, 2), None
+    ),
+    "figure_temp_line": lambda fx: (
+        fx.size, lambda hist=fx.hist: px.line(hist, x="est_time_dt", y="temp").to_json(), None
+    ),
+    "figure_temp_line_webgl_lttb": lambda fx: (
+        fx.size, lambda hist=fx.hist: downsample_figure(
+            use_webgl(px.line(hist, x="est_time_dt", y="temp")), config.CHART_MAX_POINTS
+        ).to_json(), None
+    ),
+    "figure_door_scatter": lambda fx: (
+        fx.size, lambda hist=fx.hist: px.scatter(hist, x="est_time_dt", y="door_usage").to_json(), None
+    ),
+    "door_activity_heatmap": lambda fx: (
+        fx.size, lambda hist=fx.hist: door_activity_heatmap(hist), None
+    ),
+}
+BENCHMARKS = list(_CASES)
+
+
+def _cases(size, max_fleet, only=None):
+    """Yield (name, rows, fn, setup) for the selected benchmarks at one size."""
+    fixtures = _Fixtures(size, max_fleet)
+    for name, factory in _CASES.items():
+        if only and name not in only:
+            continue
+        yield (name, *factory(fixtures))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-fleet", type=int, default=5_000)
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS)
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as store_dir:
+        _configure(store_dir)
+        for size in args.sizes:
+            for name, rows, fn, setup in _cases(size, args.max_fleet, args.only):
+                best, median = _time(fn, args.repeat, setup)
+                results.append({
+                    "benchmark": name,
+                    "size": size,
+                    "rows": rows,
+                    "best_s": round(best, 6),
+                    "median_s": round(median, 6),
+                    "rows_per_s": round(rows / best) if best else None,
+                })
+                print(f"{name:<34} {rows:>10,} rows  best {best * 1000:10.2f} ms  median {median * 1000:10.2f} ms")
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
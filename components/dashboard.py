@@ -1,33 +1,66 @@
+import os
+
 import streamlit as st
 import pandas as pd
-import folium
-from streamlit_folium import folium_static
 from datetime import datetime, timedelta
 import plotly.express as px
 
 import config
-from utils.aws import get_latest_data_for_fridge, get_historical_data_for_fridge
-from utils.data import determine_fridge_status, get_all_fridge_coordinates
-from utils.helpers import safe_plotly_chart
+from utils.aws import get_door_activity, get_historical_data_for_fridge, get_history_stats
+from utils.poller import get_status_snapshot
+from utils.data import (
+    EXCURSION_STATUSES, determine_fridge_status, door_activity_heatmap, find_excursions,
+    get_all_fridge_coordinates, get_fridge_options, status_runs
+)
+from utils.helpers import safe_plotly_chart, format_bytes, format_duration, local_now
+from utils.perf import measure
+from utils.maps import fridge_marker, show_map
+from utils.concurrency import run_concurrently
+from utils.budget import governor, OK, EXCEEDED
+from utils.export import EXPORT_FORMATS, discard_export, export_history
 from components.tooltips import create_dashboard_guides
+from styles.custom_css import get_status_color_map
+
+TIME_RANGES = {
+    "Last Hour": timedelta(hours=1),
+    "Last 24 Hours": timedelta(days=1),
+    "Last 7 Days": timedelta(days=7),
+    "Last 30 Days": timedelta(days=30),
+    "Last 90 Days": timedelta(days=90),
+    "Last Year": timedelta(days=365),
+}
+# The door heatmap needs at least a week to fill every day
+HEATMAP_RANGES = [name for name, span in TIME_RANGES.items() if span >= timedelta(days=7)]
+ALL_FRIDGES = "All fridges"
 
 def show_dashboard():
     # ─── Sidebar ─────────────────────────────────────────────
+    fridge_options = get_fridge_options()
     fridge_selection = st.sidebar.selectbox(
         "Select Fridge",
-        options=list(config.FRIDGE_OPTIONS.keys()),
-        format_func=lambda x: f"{x}: {config.FRIDGE_OPTIONS[x]}",
+        options=list(fridge_options.keys()),
+        format_func=lambda x: f"{x}: {fridge_options[x]}",
         key="dashboard_fridge_select"
     )
-    fridge_id = config.FRIDGE_OPTIONS[fridge_selection]
+    fridge_id = fridge_options[fridge_selection]
     st.sidebar.info(f"Fridge ID: {fridge_id}")
 
     time_range = st.sidebar.selectbox(
         "Select Time Range",
-        ["Last Hour", "Last 24 Hours", "Last 7 Days"],
+        list(TIME_RANGES),
         key="dashboard_time_range"
     )
 
+    compare_mode = st.sidebar.checkbox("Compare Fridges", key="dashboard_compare_mode")
+    compare_ids = []
+    if compare_mode:
+        compare_ids = st.sidebar.multiselect(
+            "Fridges to Compare",
+            options=list(fridge_options.values()),
+            default=[fridge_id],
+            key="dashboard_compare_fridges"
+        )
+
     # Auto-refresh toggle
     if "auto_refresh_enabled" not in st.session_state:
         st.session_state.auto_refresh_enabled = False
@@ -48,43 +81,34 @@ def show_dashboard():
     coords = get_all_fridge_coordinates()
     if fridge_id in coords:
         lat, lon = coords[fridge_id]
-        map_box = folium.Map(location=[lat, lon], zoom_start=15)
-        folium.Marker(
-            [lat, lon],
-            popup=f"{fridge_id}",
-            tooltip=fridge_id,
-            icon=folium.Icon(color="blue", icon="snowflake", prefix="fa")
-        ).add_to(map_box)
-        folium_static(map_box, width=700, height=300)
-
-    # ─── Placeholders ────────────────────────────────────────
-    status_slot = st.empty()
-    history_slot = st.empty()
-    footer_slot = st.empty()
+        marker = fridge_marker(lat, lon, popup=f"{fridge_id}", tooltip=fridge_id, color="blue")
+        show_map((lat, lon), 15, [marker], width=700, height=300)
+
+    # ─── Live blocks ─────────────────────────────────────────
+    # Status and history are fragments: with auto-refresh on, each tick reruns
+    # only these two blocks instead of the whole script (login, CSS, AWS
+    # setup, mini-map). Near the query budget the interval is stretched.
+    refresh_every = governor.refresh_interval() if st.session_state.auto_refresh_enabled else None
 
     def get_start_dt(now: datetime) -> datetime:
-        if time_range == "Last Hour":
-            return now - timedelta(hours=1)
-        if time_range == "Last 24 Hours":
-            return now - timedelta(days=1)
-        return now - timedelta(days=7)
-
-    def update_content():
-        now = datetime.now()
-        start_dt = get_start_dt(now)
-
-        # Status block
-        with status_slot.container():
-            latest = get_latest_data_for_fridge(fridge_id)
+        return now - TIME_RANGES[time_range]
+
+    @st.fragment(run_every=refresh_every)
+    def status_block():
+        with measure("dashboard.status_block"):
+            snapshot = get_status_snapshot()
+            latest = snapshot.latest.get(fridge_id)
+            if snapshot.error:
+                st.error(f"Error querying Timestream: {snapshot.error}")
             if not latest:
                 st.warning("No recent data.")
             else:
-                temp_val = float(latest.get("temp")) if latest.get("temp") else None
+                temp_val = float(latest["temp"]) if latest.get("temp") is not None else None
                 door_val = latest.get("door_usage", "N/A")
                 updated  = latest.get("est_time", "N/A")
 
                 status_text, color = (
-                    determine_fridge_status(temp_val)
+                    determine_fridge_status(temp_val, fridge_id)
                     if temp_val is not None else ("Unknown", "gray")
                 )
 
@@ -107,47 +131,261 @@ def show_dashboard():
                 )
                 st.caption(f"Last updated: {updated}")
 
-        # History block
-        with history_slot.container():
+    @st.fragment(run_every=refresh_every)
+    def history_block():
+        with measure("dashboard.history_block"):
+            now = local_now()
+            start_dt = get_start_dt(now)
+
             st.subheader("Historical Data")
-            hist = get_historical_data_for_fridge(fridge_id, start_dt, now)
+            # Wide ranges arrive in slices; draw what we have while they load
+            loading = st.empty()
+
+            def show_partial(partial):
+                if partial.empty:
+                    return
+                with loading.container():
+                    st.caption("Loading history…")
+                    fig = px.line(partial.sort_values("est_time_dt"), x="est_time_dt", y="temp", title="Temperature")
+                    safe_plotly_chart(fig, prefix="hist_partial")
+
+            max_points = governor.max_points(label="history_binned")
+            hist = get_historical_data_for_fridge(
+                fridge_id, start_dt, now, max_points=max_points, on_progress=show_partial
+            )
+            loading.empty()
             if hist.empty:
                 st.info("No history in this range.")
                 return
 
-            hist["temp"] = pd.to_numeric(hist["temp"], errors="coerce")
-            hist["door_usage"] = pd.to_numeric(hist["door_usage"], errors="coerce")
-
             # IMPORTANT: apply the sort
             hist = hist.sort_values("est_time_dt")
 
-            tabs = st.tabs(["Temp", "Doors", "Stats"])
+            # Zooming refetches the narrower window, which comes back at a
+            # finer resolution (raw readings once it is short enough). Plotly
+            # zoom events do not reach the server, hence the slider.
+            chart = hist
+            if hist.attrs.get("bin_width") or len(hist) > config.CHART_MAX_POINTS:
+                window_hours = (now - start_dt).total_seconds() / 3600
+                zoom_from, zoom_to = st.slider(
+                    "Zoom (hours ago)",
+                    min_value=0.0,
+                    max_value=window_hours,
+                    value=(0.0, window_hours),
+                    step=window_hours / 100,
+                    key=f"history_zoom_{time_range}",
+                )
+                if (zoom_from, zoom_to) != (0.0, window_hours):
+                    chart = get_historical_data_for_fridge(
+                        fridge_id,
+                        now - timedelta(hours=zoom_to),
+                        now - timedelta(hours=zoom_from),
+                        max_points=max_points,
+                    )
+                    if chart.empty:
+                        chart = hist
+                    else:
+                        chart = chart.sort_values("est_time_dt")
+
+            bin_width = chart.attrs.get("bin_width")
+            if bin_width:
+                st.caption(f"Aggregated into {format_duration(bin_width)} bins.")
+            if chart.attrs.get("stale"):
+                st.caption("Query budget reached: showing the last fetched data for this range.")
+
+            tabs = st.tabs(["Temp", "Doors", "Status", "Stats"])
             with tabs[0]:
-                fig = px.line(hist, x="est_time_dt", y="temp", title="Temperature")
+                temp_cols = ["temp_min", "temp", "temp_max"] if bin_width else "temp"
+                fig = px.line(chart, x="est_time_dt", y=temp_cols, title="Temperature")
                 safe_plotly_chart(fig, prefix="hist_temp")
             with tabs[1]:
-                fig = px.scatter(hist, x="est_time_dt", y="door_usage", title="Door Usage")
+                fig = px.scatter(chart, x="est_time_dt", y="door_usage", title="Door Usage")
                 safe_plotly_chart(fig, prefix="hist_door")
             with tabs[2]:
-                t = hist["temp"].dropna()
-                d = hist["door_usage"].dropna()
+                runs = status_runs(chart, fridge_id)
+                fig = px.timeline(
+                    runs, x_start="start", x_end="end", y="status", color="status",
+                    color_discrete_map=get_status_color_map(), title="Status Timeline"
+                )
+                safe_plotly_chart(fig, prefix="hist_status")
+
+                excursions = find_excursions(chart, fridge_id)
+                for status, col in zip(EXCURSION_STATUSES, st.columns(2)):
+                    spent = excursions.loc[excursions["status"] == status, "duration"].sum()
+                    col.metric(f"Time {status}", f"{pd.Timedelta(spent).total_seconds() / 3600:.1f} h")
+                if excursions.empty:
+                    st.info("No excursions in this range.")
+                else:
+                    st.dataframe(
+                        excursions.drop(columns="readings").iloc[::-1],
+                        hide_index=True,
+                        use_container_width=True,
+                        column_config={
+                            "status": "Status",
+                            "start": st.column_config.DatetimeColumn("Start", format="MM/DD/YYYY hh:mm a"),
+                            "end": st.column_config.DatetimeColumn("End", format="MM/DD/YYYY hh:mm a"),
+                            "duration": "Duration",
+                            "peak_temp": st.column_config.NumberColumn("Peak (°F)", format="%.1f"),
+                        },
+                    )
+            with tabs[3]:
+                # Served from the hourly/daily rollups, not from `hist`
+                stats = get_history_stats(fridge_id, start_dt, now)
+                if stats is None:
+                    st.info("No stats for this range.")
+                    return
                 a, b, c = st.columns(3)
-                a.metric("Avg Temp", f"{t.mean():.1f}°F" if not t.empty else "N/A")
-                b.metric("Max Temp", f"{t.max():.1f}°F" if not t.empty else "N/A")
-                c.metric("Min Temp", f"{t.min():.1f}°F" if not t.empty else "N/A")
+                a.metric("Avg Temp", f"{stats['temp_avg']:.1f}°F" if stats["temp_avg"] is not None else "N/A")
+                b.metric("Max Temp", f"{stats['temp_max']:.1f}°F" if stats["temp_max"] is not None else "N/A")
+                c.metric("Min Temp", f"{stats['temp_min']:.1f}°F" if stats["temp_min"] is not None else "N/A")
 
                 x, y, z = st.columns(3)
-                x.metric("Total Door Interaction", int(d.sum()) if not d.empty else 0)
-                y.metric("Max Door Interaction", int(d.max()) if not d.empty else 0)
-                z.metric("Avg Door Interaction", f"{d.mean():.1f}" if not d.empty else "N/A")
+                x.metric("Total Door Interaction", stats["door_total"])
+                y.metric("Max Door Interaction", stats["door_max"])
+                z.metric("Avg Door Interaction", f"{stats['door_avg']:.1f}" if stats["door_avg"] is not None else "N/A")
 
-    # Initial draw
-    update_content()
+    @st.fragment(run_every=refresh_every)
+    def comparison_block():
+        with measure("dashboard.comparison_block"):
+            now = local_now()
+            start_dt = get_start_dt(now)
 
-    # Streamlit-native refresh (no while loop)
-    if st.session_state.auto_refresh_enabled:
-        st.autorefresh(interval=int(config.REFRESH_RATE * 1000), key="dashboard_autorefresh")
-        footer_slot.caption(f"Auto-refresh enabled (every {config.REFRESH_RATE}s).")
+            st.subheader("Fridge Comparison")
+            if not compare_ids:
+                st.info("Select fridges to compare in the sidebar.")
+                return
+
+            # One history query per fridge, run side by side
+            max_points = governor.max_points(label="history_binned")
+            results = dict(run_concurrently(
+                lambda fid: get_historical_data_for_fridge(fid, start_dt, now, max_points=max_points),
+                compare_ids
+            ))
+            frames = [
+                results[fid].assign(fridge_id=fid)
+                for fid in compare_ids if not results[fid].empty
+            ]
+            if not frames:
+                st.info("No history in this range.")
+                return
+
+            combined = pd.concat(frames, ignore_index=True).sort_values("est_time_dt")
+
+            tabs = st.tabs(["Temp", "Doors"])
+            with tabs[0]:
+                fig = px.line(combined, x="est_time_dt", y="temp", color="fridge_id", title="Temperature")
+                safe_plotly_chart(fig, prefix="compare_temp")
+            with tabs[1]:
+                fig = px.scatter(combined, x="est_time_dt", y="door_usage", color="fridge_id", title="Door Usage")
+                safe_plotly_chart(fig, prefix="compare_door")
+
+    @st.fragment
+    def door_activity_block():
+        with measure("dashboard.door_activity_block"):
+            st.subheader("Door Activity by Hour")
+            col_scope, col_range = st.columns(2)
+            fleet_ids = list(get_fridge_options().values())
+            scope = col_scope.selectbox(
+                "Fridges",
+                options=[ALL_FRIDGES] + fleet_ids,
+                key="door_heatmap_scope"
+            )
+            range_name = col_range.selectbox(
+                "Range",
+                options=HEATMAP_RANGES,
+                index=HEATMAP_RANGES.index("Last 30 Days"),
+                key="door_heatmap_range"
+            )
+
+            # Hour-aligned window, so reruns hit the cached buckets/rollups
+            now = local_now().replace(minute=0, second=0, microsecond=0)
+            hourly = get_door_activity(
+                now - TIME_RANGES[range_name], now,
+                fridge_id=None if scope == ALL_FRIDGES else scope
+            )
+            if hourly.empty:
+                st.info("No door activity in this range.")
+                return
+
+            heatmap = door_activity_heatmap(hourly)
+            fig = px.imshow(
+                heatmap,
+                labels=dict(x="Hour of day", y="", color="Door events / hour"),
+                color_continuous_scale="Blues",
+                aspect="auto",
+                title="Fleet" if scope == ALL_FRIDGES else scope
+            )
+            fig.update_xaxes(dtick=1)
+            safe_plotly_chart(fig, prefix="door_heatmap")
+            st.caption(f"Average door events per hour over {len(hourly):,} hours, local time.")
+
+    @st.fragment
+    def export_block():
+        with st.expander("Export Data"):
+            now = local_now()
+            scope = st.radio("Fridges", ["This fridge", "All fridges"], horizontal=True, key="export_scope")
+            fmt_name = st.radio("Format", list(EXPORT_FORMATS), horizontal=True, key="export_format")
+            dates = st.date_input(
+                "Date range",
+                value=(get_start_dt(now).date(), now.date()),
+                max_value=now.date(),
+                key="export_dates"
+            )
+            if len(dates) != 2:
+                st.info("Pick a start and an end date.")
+                return
+            start_dt = datetime.combine(dates[0], datetime.min.time())
+            end_dt = min(datetime.combine(dates[1] + timedelta(days=1), datetime.min.time()), now)
+            fridge_ids = [fridge_id] if scope == "This fridge" else list(get_fridge_options().values())
+            ext, mime = EXPORT_FORMATS[fmt_name]
+
+            if st.button("Prepare Export", key="export_prepare"):
+                if governor.level(label="export") == EXCEEDED:
+                    st.warning("Timestream query budget is used up; try the export again later.")
+                    return
+                progress = st.empty()
+                try:
+                    path, rows = export_history(
+                        fridge_ids, start_dt, end_dt, ext,
+                        on_progress=lambda n: progress.caption(f"Exported {n:,} rows…")
+                    )
+                except Exception as e:
+                    st.error(f"Error exporting from Timestream: {e}")
+                    return
+                progress.empty()
+                if path is None:
+                    st.info("No readings in this range.")
+                    return
+                # The button copies the file into Streamlit's media store, so it is
+                # only built here, right after the export, and the file goes at once
+                name = fridge_id if scope == "This fridge" else "all-fridges"
+                file_name = f"{name}_{dates[0]:%Y%m%d}-{dates[1]:%Y%m%d}.{ext}"
+                try:
+                    st.caption(f"{rows:,} rows ready ({format_bytes(os.path.getsize(path))})")
+                    with open(path, "rb") as f:
+                        st.download_button(
+                            f"Download {file_name}",
+                            data=f,
+                            file_name=file_name,
+                            mime=mime,
+                            on_click="ignore",
+                            key="export_download"
+                        )
+                finally:
+                    discard_export(path)
+
+    # Initial draw (the fragments then refresh themselves)
+    status_block()
+    if compare_mode:
+        comparison_block()
     else:
-        footer_slot.caption("Auto-refresh is disabled. Click 'Start Auto-Refresh' in the sidebar to enable.")
+        history_block()
+    door_activity_block()
+    export_block()
 
+    if governor.level() != OK:
+        st.warning("Timestream query budget is nearly used up: charts are coarser and refresh less often.")
+    if st.session_state.auto_refresh_enabled:
+        st.caption(f"Auto-refresh enabled (every {refresh_every}s).")
+    else:
+        st.caption("Auto-refresh is disabled. Click 'Start Auto-Refresh' in the sidebar to enable.")
@@ -0,0 +1,76 @@
+# components/diagnostics.py
+import streamlit as st
+import pandas as pd
+
+from utils.telemetry import recent_queries, cache_stats
+from utils.perf import last_timings
+from utils.budget import governor
+from utils.helpers import format_bytes
+
+
+def show_diagnostics():
+    """Admin-only sidebar panel with query latency, bytes scanned and cache hit rates."""
+    if not st.session_state.get("is_admin"):
+        return
+
+    with st.sidebar.expander("Diagnostics"):
+        queries = recent_queries()
+        if queries:
+            latencies = [q.latency_ms for q in queries]
+            col1, col2 = st.columns(2)
+            col1.metric("Queries", len(queries))
+            col2.metric("Avg latency", f"{sum(latencies) / len(latencies):.0f} ms")
+            col1.metric("Scanned", format_bytes(sum(q.bytes_scanned for q in queries)))
+            col2.metric("Metered", format_bytes(sum(q.bytes_metered for q in queries)))
+
+            recent = pd.DataFrame([{
+                "label": q.label,
+                "latency_ms": round(q.latency_ms, 1),
+                "pages": q.pages,
+                "rows": q.rows,
+                "scanned": format_bytes(q.bytes_scanned),
+                "error": q.error or "",
+            } for q in reversed(queries[-20:])])
+            st.caption("Recent queries")
+            st.dataframe(recent, hide_index=True, use_container_width=True)
+        else:
+            st.caption("No Timestream queries recorded yet.")
+
+        usage = governor.usage()
+        st.caption(
+            f"Budget ({governor.level()}): session {format_bytes(usage['session'])} of "
+            f"{format_bytes(governor.session_budget)}, process {format_bytes(usage['process'])} of "
+            f"{format_bytes(governor.process_budget)} per {governor.window // 60} min"
+        )
+
+        caches = cache_stats()
+        if caches:
+            st.caption("Cache hit rates")
+            st.dataframe(
+                pd.DataFrame([
+                    {
+                        "cache": name,
+                        "calls": stats["calls"],
+                        "hits": stats["hits"],
+                        "hit_rate": f"{stats['hit_rate']:.0%}" if stats["hit_rate"] is not None else "N/A",
+                    }
+                    for name, stats in sorted(caches.items())
+                ]),
+                hide_index=True,
+                use_container_width=True,
+            )
+
+        if last_timings:
+            st.caption("Last render timings")
+            st.dataframe(
+                pd.DataFrame([
+                    {
+                        "block": name,
+                        "cpu_ms": round(t["cpu_ms"], 1) if "cpu_ms" in t else None,
+                        "wall_ms": round(t["wall_ms"], 1),
+                    }
+                    for name, t in sorted(last_timings.items())
+                ]),
+                hide_index=True,
+                use_container_width=True,
+            )
@@ -1,21 +1,83 @@
 # components/map_view.py
 
+import math
+
+import numpy as np
 import streamlit as st
 import pandas as pd
-import folium
-from folium.plugins import MarkerCluster
-from streamlit_folium import folium_static
 import plotly.express as px
-import time
-from datetime import datetime, timedelta
 
-from utils.aws import get_latest_data_for_all_fridges
-from utils.data import get_all_fridge_coordinates, get_fridge_locations, determine_fridge_status
+from utils.poller import get_status_snapshot
+from utils.data import STATUS_COLORS, classify_fleet
 from utils.helpers import safe_plotly_chart
-from styles.custom_css import apply_custom_css, color_status_style, get_status_color_map
+from utils.maps import site_point, show_cluster_map
+from utils.registry import get_registry
+from utils.budget import governor
+from styles.custom_css import apply_custom_css, get_status_color_map, get_status_icon_map
 
 import config
 
+ALL_SITES = "All sites"
+STATUS_TABLE_COLUMNS = [
+    "Fridge ID", "Address", "Status", "Temperature (°F)", "Door Usage (24h)", "Last Updated"
+]
+# Table sort order for "Status": problems first
+STATUS_SEVERITY = {"Too warm": 0, "Too cold": 1, "No data": 2, "Normal": 3}
+SORT_COLUMNS = ["Status", "Fridge ID", "Temperature (°F)", "Door Usage (24h)", "Last Updated"]
+
+def site_statuses(sites, latest_all):
+    """Registry rows joined with their latest reading and status ("No data" without one)."""
+    latest = pd.DataFrame.from_dict(dict(latest_all), orient="index").reindex(
+        columns=["temp", "door_usage", "est_time", "time"]
+    )
+    frame = sites.join(latest, on="fridge_id")
+    status = classify_fleet(frame["temp"], frame["fridge_id"])
+    frame["status"] = np.where(status == "Unknown", "No data", status)
+    return frame
+
+def build_status_table(latest_all, fridge_ids=None):
+    """
+    One row per mapped fridge (or per id in ``fridge_ids``) with its status,
+    latest temperature and door usage; "Last Updated" is a local timestamp.
+    """
+    sites = get_registry().sites
+    if fridge_ids is not None:
+        sites = sites[sites["fridge_id"].isin(fridge_ids)]
+    frame = site_statuses(sites, latest_all)
+    # sorted as timestamps, formatted only for display
+    updated = (
+        pd.to_datetime(frame["time"])
+        .dt.tz_localize("UTC")
+        .dt.tz_convert(config.LOCAL_TIMEZONE)
+        .dt.tz_localize(None)
+    )
+    return pd.DataFrame({
+        "Fridge ID":         frame["fridge_id"].to_numpy(),
+        "Address":           frame["address"].to_numpy(),
+        "Status":            frame["status"].to_numpy(),
+        "Temperature (°F)":  pd.to_numeric(frame["temp"], errors="coerce").to_numpy(),
+        "Door Usage (24h)":  pd.to_numeric(frame["door_usage"], errors="coerce").to_numpy(),
+        "Last Updated":      updated.to_numpy(),
+    }, columns=STATUS_TABLE_COLUMNS)
+
+def sort_status_table(df, by, descending=False):
+    """Sort the whole table (not just the visible page); missing values last."""
+    key = (lambda col: col.map(STATUS_SEVERITY)) if by == "Status" else None
+    return df.sort_values(by, ascending=not descending, na_position="last", kind="stable", key=key)
+
+def zoom_for_radius(lat, radius_km):
+    """Leaflet zoom level at which ``radius_km`` spans roughly a map half-width."""
+    metres_per_pixel = radius_km * 1000 / 250
+    zoom = math.log2(156543.03 * math.cos(math.radians(lat)) / metres_per_pixel)
+    return int(min(max(zoom, 3), 17))
+
+def visible_sites(registry, center_fridge, radius_km):
+    """Registry rows shown on the map: the whole fleet, or sites within the radius of a fridge."""
+    if center_fridge == ALL_SITES:
+        return registry.sites, config.MAP_CENTER, 12
+    lat, lon = registry.coordinates[center_fridge]
+    return registry.within_radius(lat, lon, radius_km), (lat, lon), zoom_for_radius(lat, radius_km)
+
 def show_map_view():
     # ─── 1) one-time setup ────────────────────────────────────
     apply_custom_css()
@@ -42,91 +104,91 @@ def show_map_view():
         key="map_status_filter"
     )
 
-    # build the base map once - keep this outside the refresh loop
-    coords     = get_all_fridge_coordinates()
-    latest_all = get_latest_data_for_all_fridges()
-    base_map   = folium.Map(location=[37.5407, -77.4360], zoom_start=12)
-    cluster    = MarkerCluster().add_to(base_map)
-
-    for fid, addr in get_fridge_locations().items():
-        if fid not in coords:
-            continue
-        lat, lon = coords[fid]
-        data = latest_all.get(fid, {})
-        temp = data.get("temp")
-        status, color = (
-            determine_fridge_status(float(temp)) if temp is not None
-            else ("No data", "gray")
+    # map area: the whole fleet, or the sites around one fridge. The map and
+    # table only carry the visible sites.
+    registry = get_registry()
+    center_fridge = st.sidebar.selectbox(
+        "Map Area",
+        options=[ALL_SITES] + registry.sites["fridge_id"].tolist(),
+        format_func=lambda x: x if x == ALL_SITES else f"Around {x}",
+        key="map_center_fridge"
+    )
+    radius_km = st.sidebar.slider(
+        "Radius (km)", min_value=1, max_value=50, value=5,
+        key="map_radius_km", disabled=center_fridge == ALL_SITES
+    )
+    sites, center, zoom = visible_sites(registry, center_fridge, radius_km)
+    visible_ids = sites["fridge_id"].tolist()
+
+    # sites are drawn client-side by one fast-cluster layer; the rendered HTML
+    # is reused across reruns until a site's status changes
+    frame  = site_statuses(sites, get_status_snapshot().latest)
+    colors = frame["status"].map({**STATUS_COLORS, "No data": "gray"})
+    points = [
+        site_point(lat, lon, fid, addr, status, color)
+        for fid, addr, lat, lon, status, color in zip(
+            frame["fridge_id"], frame["address"], frame["lat"], frame["lon"], frame["status"], colors
         )
-        folium.Marker(
-            [lat, lon],
-            popup=(
-                f"<b>{fid}</b><br>{addr}"
-                f"<br><b>Status:</b> {status}"
-                f"<br><b>Temp:</b> {temp if temp is not None else 'N/A'}°C"
-            ),
-            icon=folium.Icon(color=color, icon="snowflake", prefix="fa")
-        ).add_to(cluster)
+    ]
 
     st.subheader("Interactive Map")
-    folium_static(base_map, width=800, height=400)
+    st.caption(f"{len(visible_ids)} of {len(registry)} sites in view")
+    show_cluster_map(center, zoom, points, width=800, height=400)
 
-    # ─── Create placeholder for dynamic content ─────────────────────
-    data_container = st.empty()
-    refresh_footer = st.empty()
+    # ─── Dynamic content: a fragment rerun on a timer ────────────────
+    # Only this function reruns on each tick; the map and filters above stay
+    # as they are and no thread is held between ticks.
+    refresh_every = governor.refresh_interval() if st.session_state.map_auto_refresh_enabled else None
 
-    # Function to update data content
+    @st.fragment(run_every=refresh_every)
     def update_data_content():
-        # fetch fresh data
-        latest_all = get_latest_data_for_all_fridges()
-        rows = []
-        for fid, addr in get_fridge_locations().items():
-            if fid not in coords:
-                continue
-            data = latest_all.get(fid, {})
-            temp = data.get("temp")
-            if temp is not None:
-                status, _ = determine_fridge_status(float(temp))
-                door    = data.get("door_usage", "N/A")
-                updated = data.get("est_time",    "N/A")
-            else:
-                status, door, updated = "No data", "N/A", "N/A"
-
-            rows.append({
-                "Fridge ID":         fid,
-                "Address":           addr,
-                "Status":            status,
-                "Temperature (°F)":  temp if temp is not None else "N/A",
-                "Door Usage (24h)":  door,
-                "Last Updated":      updated
-            })
-
-        df = pd.DataFrame(rows)
+        # read the shared status snapshot (no query per session)
+        snapshot   = get_status_snapshot()
+        latest_all = snapshot.latest
+        df = build_status_table(latest_all, visible_ids)
         filtered = df[df["Status"].isin(status_filter)]
 
-        with data_container.container():
+        with st.container():
             # table + pie in two columns
             col_table, col_chart = st.columns([4,2])
 
             with col_table:
                 st.subheader("Fridge Status Table")
-                st.caption(f"Showing {len(filtered)} of {len(df)} fridges")
-                styled = filtered.style.map(
-                    color_status_style(), subset=["Status"]
+                col_sort, col_order = st.columns([3, 1])
+                sort_by = col_sort.selectbox("Sort by", SORT_COLUMNS, key="map_table_sort")
+                descending = col_order.toggle("Descending", key="map_table_descending")
+                filtered = sort_status_table(filtered, sort_by, descending)
+
+                page_size = config.MAP_TABLE_PAGE_SIZE
+                pages = max(math.ceil(len(filtered) / page_size), 1)
+                # the filter or map area may have shrunk the table under the current page
+                if st.session_state.get("map_table_page", 1) > pages:
+                    st.session_state.map_table_page = pages
+                page = st.number_input(
+                    "Page", min_value=1, max_value=pages, value=1, step=1,
+                    key="map_table_page"
+                ) if pages > 1 else 1
+                first = (page - 1) * page_size
+                page_rows = filtered.iloc[first:first + page_size]
+                st.caption(
+                    f"Showing {first + 1 if len(page_rows) else 0}–{first + len(page_rows)} "
+                    f"of {len(filtered)} fridges ({len(df)} in view)"
                 )
-                
-                # Add column width configuration
+                # status colour comes from an icon prefix; only the page is sent
+                icons = page_rows["Status"].map(get_status_icon_map())
                 st.dataframe(
-                    styled, 
-                    hide_index=True, 
+                    page_rows.assign(Status=icons + " " + page_rows["Status"]),
+                    hide_index=True,
                     use_container_width=True,
                     column_config={
-                        "Last Updated": st.column_config.TextColumn(width=200),
+                        "Last Updated": st.column_config.DatetimeColumn(
+                            width=200, format="MM/DD/YYYY, hh:mm:ss a"
+                        ),
                         "Fridge ID": st.column_config.TextColumn(width=150),
                         "Address": st.column_config.TextColumn(width=250),
-                        "Status": st.column_config.TextColumn(width=100),
-                        "Temperature (°F)": st.column_config.TextColumn(width=120),
-                        "Door Usage (24h)": st.column_config.TextColumn(width=120)
+                        "Status": st.column_config.TextColumn(width=110),
+                        "Temperature (°F)": st.column_config.NumberColumn(width=120, format="%.1f"),
+                        "Door Usage (24h)": st.column_config.NumberColumn(width=120, format="%d")
                     }
                 )
 
@@ -144,19 +206,15 @@ def show_map_view():
                 else:
                     st.info("No statuses to show.")
 
-            st.caption(f"Last refreshed: {datetime.now():%Y-%m-%d %H:%M:%S}")
+            if snapshot.error:
+                st.error(f"Error querying Timestream: {snapshot.error}")
+            if snapshot.taken_at:
+                st.caption(f"Last refreshed: {snapshot.taken_at:%Y-%m-%d %H:%M:%S}")
 
-    # Initial data load
+    # Initial data load (the fragment then refreshes itself)
     update_data_content()
-    
-    # Show appropriate footer message
-    if not st.session_state.map_auto_refresh_enabled:
-        refresh_footer.caption("Auto-refresh is disabled. Click 'Start Auto-Refresh' in the sidebar to enable.")
-    
-    # ─── Auto-refresh loop ────────────────────────────────────
-    while st.session_state.map_auto_refresh_enabled:
-        next_refresh_time = datetime.now() + timedelta(seconds=config.REFRESH_RATE)
-        refresh_footer.caption(f"Auto-refresh enabled. Next update @ {next_refresh_time.strftime('%H:%M:%S')}")
-        
-        time.sleep(config.REFRESH_RATE)
-        update_data_content()
\ No newline at end of file
+
+    if st.session_state.map_auto_refresh_enabled:
+        st.caption(f"Auto-refresh enabled (every {refresh_every}s).")
+    else:
+        st.caption("Auto-refresh is disabled. Click 'Start Auto-Refresh' in the sidebar to enable.")
@@ -11,27 +11,80 @@ AWS_REGION_DEFAULT = "us-east-1"
 DATABASE_NAME_DEFAULT = "RVACF-Timestream-DB"
 TABLE_NAME_DEFAULT = "multi_value"
 
-# Define fridge options and locations
-FRIDGE_OPTIONS = {
-    3: "oakwood-art-fridge",
-    7: "cary-st-fridge",
-    11: "fonticello-fridge",
-    14: "expo-fridge"
-}
-
-FRIDGE_LOCATIONS = {
-    "fonticello-fridge": "255 W 27th St, Richmond, VA",
-    "oakwood-art-fridge": "917 N 35th St, Richmond, VA",
-    "cary-st-fridge": "2913 W Cary St, Richmond, VA",
-    "expo-fridge": "1200 West Broad Street, Richmond, VA"
-}
-
-FRIDGE_COORDINATES = {
-    "fonticello-fridge": (37.5316, -77.4330),
-    "oakwood-art-fridge": (37.5409, -77.4113),
-    "cary-st-fridge": (37.5553, -77.4834),
-    "expo-fridge": (37.55227, -77.4526)
-}
+# Shared Timestream client (connection pool size and botocore retry policy)
+TIMESTREAM_MAX_POOL_CONNECTIONS = 20
+TIMESTREAM_RETRY_MODE = "adaptive"
+TIMESTREAM_MAX_ATTEMPTS = 5
+
+# Upper bound on Timestream queries run in parallel for a single view
+MAX_QUERY_WORKERS = 4
+
+# Local time zone of the fridges (Timestream stores `time` in UTC)
+LOCAL_TIMEZONE = "America/New_York"
+
+# "Latest reading" lookups only consider this many hours of telemetry
+LATEST_LOOKBACK_HOURS = 24
+
+# Historical charts: windows up to this many hours are returned as raw
+# readings, wider windows are binned server-side to about this many points.
+HISTORY_RAW_WINDOW_HOURS = 2
+HISTORY_MAX_POINTS = 500
+
+# Chart traces are reduced (LTTB) to about CHART_MAX_POINTS points, roughly
+# one per pixel of chart width, and drawn with WebGL once a figure holds more
+# than CHART_WEBGL_THRESHOLD points.
+CHART_MAX_POINTS = 1200
+CHART_WEBGL_THRESHOLD = 1000
+
+# Binned history is cached in epoch-aligned buckets of this many bins; only
+# the newest, still-filling bucket is queried again on refresh.
+HISTORY_BUCKET_BINS = 48
+HISTORY_BUCKET_CACHE_ENTRIES = 4096
+
+# Local telemetry store (raw readings downloaded from Timestream)
+LOCAL_STORE_PATH = ".cache/telemetry.sqlite3"
+LOCAL_STORE_RETENTION_DAYS = 7
+
+# Hourly/daily rollups kept in the local store. Binned history whose bin width
+# is a whole number of hours is served from them, as are the Stats figures.
+LOCAL_ROLLUP_RETENTION_DAYS = 400
+
+# Wide fetches are split into epoch-aligned time slices run in parallel (up
+# to MAX_QUERY_WORKERS at a time), each stored or cached on its own: rollups
+# in slices of ROLLUP_SLICE_DAYS, binned history in runs of at most
+# HISTORY_SLICE_BUCKETS buckets.
+ROLLUP_SLICE_DAYS = 7
+HISTORY_SLICE_BUCKETS = 4
+
+# Timestream cost budgets: bytes metered per rolling window, per browser
+# session and per server process. Past BUDGET_SOFT_LIMIT of a budget the app
+# degrades (coarser bins, slower auto-refresh); once a budget is spent it
+# serves cached results instead of issuing new history queries.
+QUERY_BUDGET_WINDOW_SECONDS = 3600
+SESSION_BYTES_BUDGET = 5 * 1024**3
+PROCESS_BYTES_BUDGET = 50 * 1024**3
+BUDGET_SOFT_LIMIT = 0.8
+
+# History exports are written to temp files; files left behind (e.g. by an
+# export interrupted with a rerun) are deleted after this many seconds.
+EXPORT_FILE_TTL_SECONDS = 3600
+
+# Fridge registry: one row per site (number, fridge_id, address, lat, lon).
+# Reloaded when the file changes; relative to the repository root. See
+# utils/registry.py.
+FRIDGE_REGISTRY_PATH = "data/fridges.csv"
+
+# Spatial index cell size (degrees) for radius lookups
+REGISTRY_GRID_DEGREES = 0.05
+
+# Map view: default center, and rows per page of the fleet table
+MAP_CENTER = (37.5407, -77.4360)
+MAP_TABLE_PAGE_SIZE = 50
+
+# Safe temperature range (°F) per fridge as (min, max); fridges not listed
+# use DEFAULT_TEMP_RANGE
+DEFAULT_TEMP_RANGE = (0, 50)
+FRIDGE_TEMP_RANGES = {}
 
 # Help text for sidebar
 HELP_TEXT = """
@@ -54,6 +107,12 @@ KEYBOARD_SHORTCUTS = """
 - **S** - Save current view
 """
 
+# Performance budgets (seconds): process start to first paint, and per rerun
+STARTUP_BUDGET_SECONDS = 5.0
+RERUN_BUDGET_SECONDS = 1.0
+
 # Data refresh rate in seconds
 REFRESH_RATE = 5
+# The status poller pauses when no session has read its snapshot for this long
+POLLER_IDLE_SECONDS = 60
 
@@ -27,24 +27,11 @@ def main():
     require_admin()
 
     # 4) Only now import modules that may call st.* at import-time
-    from components.dashboard import show_dashboard
-    from components.map_view import show_map_view
     from styles.custom_css import apply_custom_css
 
     apply_custom_css()
 
-    # 5) Configure AWS session SERVER-SIDE via Streamlit Secrets
-    import boto3
-    session = boto3.Session(
-        aws_access_key_id=st.secrets["AWS_ACCESS_KEY_ID"],
-        aws_secret_access_key=st.secrets["AWS_SECRET_ACCESS_KEY"],
-        region_name=config.AWS_REGION
-    )
-
-    from utils.aws import set_aws_session
-    set_aws_session(session)
-
-    # 6) Initialize session state (UI only)
+    # 5) Initialize session state (UI only)
     st.session_state.setdefault("show_tips", True)
     st.session_state.setdefault("show_welcome", False)
     st.session_state.setdefault("show_map_welcome", False)
@@ -53,10 +40,21 @@ def main():
     st.sidebar.title("Navigation")
     page = st.sidebar.radio("Select Page", ["Dashboard", "Map View"], key="nav_radio")
 
-    # Display selected page
+    # 6) Configure AWS session SERVER-SIDE via Streamlit Secrets
+    #    (created and validated via STS once per process, not on every rerun)
+    from utils.aws import init_aws_session
+    init_aws_session(
+        st.secrets["AWS_ACCESS_KEY_ID"],
+        st.secrets["AWS_SECRET_ACCESS_KEY"],
+        config.AWS_REGION
+    )
+
+    # Display selected page (heavy page modules are imported only when shown)
     if page == "Dashboard":
+        from components.dashboard import show_dashboard
         show_dashboard()
     else:
+        from components.map_view import show_map_view
         show_map_view()
 
     # Footer
@@ -66,9 +64,14 @@ def main():
     with st.sidebar.expander("Need Help?"):
         st.markdown(config.HELP_TEXT)
 
+    from components.diagnostics import show_diagnostics
+    show_diagnostics()
+
     from datetime import datetime
     st.sidebar.caption(f"Last refreshed: {datetime.now().strftime('%m/%d/%Y, %I:%M:%S %p')}")
 
 if __name__ == "__main__":
-    main()
+    from utils.perf import page_run
+    with page_run():
+        main()
 
@@ -168,17 +168,15 @@ def get_status_indicator_style(status, color):
     </div>
     """
 
-def color_status_style():
-    def color_status(val):
-        if "Normal" in val:
-            return 'background-color: #c6efce; color: #006100'
-        elif "cold" in val:
-            return 'background-color: #bdd7ee; color: #1f497d'
-        elif "warm" in val:
-            return 'background-color: #ffc7ce; color: #9c0006'
-        else:  # No data
-            return 'background-color: #f2f2f2; color: #666666'
-    return color_status
+# Status markers for st.dataframe columns (native column config has no cell colors)
+def get_status_icon_map():
+    return {
+        "Normal": "🟢",
+        "Too cold": "🔵",
+        "Too warm": "🔴",
+        "No data": "⚪",
+        "Unknown": "⚪"
+    }
 
 # Color map for plotly charts
 def get_status_color_map():
@@ -186,5 +184,6 @@ def get_status_color_map():
         "Normal": "#c6efce", 
         "Too cold": "#bdd7ee", 
         "Too warm": "#ffc7ce",
-        "No data": "#f2f2f2"
+        "No data": "#f2f2f2",
+        "Unknown": "#f2f2f2"
     }
\ No newline at end of file
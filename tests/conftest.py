@@ -0,0 +1,30 @@
+# tests/conftest.py
+# Run the tests against the app modules at the repository root.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime, timezone
+
+import pytest
+
+import config
+
+# The fake Timestream client serves readings up to this time
+FAKE_NOW = datetime(2025, 3, 1, 12, 37, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def fake_timestream(tmp_path, monkeypatch):
+    """A FakeTimestreamClient for one fridge ("fridge-a") and an empty local store."""
+    from benchmarks.fake_timestream import FakeTimestreamClient
+    from utils import aws
+
+    monkeypatch.setattr(config, "LOCAL_STORE_PATH", str(tmp_path / "telemetry.sqlite3"))
+    monkeypatch.setattr(config, "DATABASE_NAME", config.DATABASE_NAME_DEFAULT, raising=False)
+    monkeypatch.setattr(config, "TABLE_NAME", config.TABLE_NAME_DEFAULT, raising=False)
+    client = FakeTimestreamClient(["fridge-a"], now=FAKE_NOW)
+    monkeypatch.setattr(aws, "get_timestream_client", lambda: client)
+    aws.clear_history_cache()
+    return client
@@ -0,0 +1,26 @@
+# tests/test_diagnostics.py
+from streamlit.testing.v1 import AppTest
+
+
+def _diagnostics_app():
+    import streamlit as st
+    from components.diagnostics import show_diagnostics
+    from utils.perf import measure, page_run
+
+    with page_run():
+        with measure("test.block"):
+            st.write("page")
+        show_diagnostics()
+
+
+def test_diagnostics_survives_reruns():
+    # The second run sees the main.rerun / main.first_paint timings of the first
+    at = AppTest.from_function(_diagnostics_app)
+    at.session_state["is_admin"] = True
+    at.run()
+    at.run()
+
+    assert not at.exception
+    timings = at.sidebar.expander[0].dataframe[-1].value
+    assert {"main.rerun", "main.first_paint", "test.block"} <= set(timings["block"])
+    assert timings["cpu_ms"].notna().all()
@@ -0,0 +1,41 @@
+# tests/test_downsample.py
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import pytest
+
+from utils.downsample import downsample_figure, use_webgl
+
+
+def _history(n=3000):
+    times = pd.date_range("2025-01-01", periods=n, freq="min")
+    return pd.DataFrame({
+        "est_time_dt": np.tile(times, 2),
+        "temp": np.random.default_rng(0).normal(38, 2, 2 * n),
+        "fridge_id": np.repeat(["fridge-a", "fridge-b"], n),
+    })
+
+
+@pytest.mark.parametrize("color, names", [(None, [""]), ("fridge_id", ["fridge-a", "fridge-b"])])
+def test_use_webgl_keeps_every_trace(color, names):
+    # Short traces: plotly rejected the rebuilt trace list for these
+    hist = _history(20)
+    if color is None:
+        hist = hist[hist["fridge_id"] == "fridge-a"]
+    fig = px.line(hist, x="est_time_dt", y="temp", color=color)
+
+    use_webgl(fig)
+
+    assert [t.type for t in fig.data] == ["scattergl"] * len(names)
+    assert [t.name for t in fig.data] == names
+    assert [len(t.y) for t in fig.data] == [20] * len(names)
+
+
+def test_downsample_webgl_figure_keeps_endpoints():
+    fig = use_webgl(px.line(_history(), x="est_time_dt", y="temp", color="fridge_id"))
+
+    downsample_figure(fig, 500)
+
+    for trace in fig.data:
+        assert len(trace.y) == 500
+        assert pd.Timestamp(trace.x[0]) == pd.Timestamp("2025-01-01")
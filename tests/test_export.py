@@ -0,0 +1,32 @@
+# tests/test_export.py
+import os
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+from utils import export
+
+
+def test_write_tables_conforms_later_pages(tmp_path):
+    # A later page whose temp column came back as strings, without region
+    first = pa.table({"temp": pa.array([38.5, 39.0]), "region": pa.array(["a", "b"])})
+    later = pa.table({"temp": pa.array(["40.5", "n/a"])})
+    path = str(tmp_path / "out.csv")
+
+    rows = export.write_tables([first, later], path, "csv")
+
+    written = pa_csv.read_csv(path, convert_options=pa_csv.ConvertOptions(strings_can_be_null=True))
+    assert rows == 4
+    assert written.column("temp").to_pylist() == [38.5, 39.0, 40.5, None]
+    assert written.column("region").to_pylist() == ["a", "b", None, None]
+
+
+def test_sweep_exports_removes_stale_files(tmp_path):
+    path = str(tmp_path / "fridge-export-stale.csv")
+    open(path, "w").close()
+    export._export_files[path] = 0.0
+
+    export.sweep_exports(max_age=60)
+
+    assert not os.path.exists(path)
+    assert path not in export._export_files
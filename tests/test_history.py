@@ -0,0 +1,58 @@
+# tests/test_history.py
+from datetime import timedelta
+
+import pytest
+
+from conftest import FAKE_NOW
+from utils import aws, store
+from utils.queries import from_epoch_ms, to_epoch_ms
+
+END = from_epoch_ms(to_epoch_ms(FAKE_NOW))
+
+
+def test_history_stats_refresh_reuses_the_first_hour(fake_timestream):
+    # Two refreshes of a 7-day window a minute apart, within the same hours
+    for tick in (2, 1):
+        end = END - timedelta(minutes=tick)
+        before = len(fake_timestream.queries)
+        stats = aws.get_history_stats("fridge-a", end - timedelta(days=7), end)
+        assert stats is not None
+
+    # Only the raw store and the rollups are topped up on the second refresh
+    assert len(fake_timestream.queries) - before == 2
+
+
+def _stored(start, end):
+    return store.read_readings("fridge-a", to_epoch_ms(start) * 1_000_000, to_epoch_ms(end) * 1_000_000)
+
+
+def test_failed_top_up_is_fetched_again(fake_timestream, monkeypatch):
+    start = END - timedelta(hours=2)
+    aws.sync_raw_history("fridge-a", start, END - timedelta(hours=1))
+
+    # The top-up stores its newest page, then fails
+    fetch = aws.iter_query_frames
+
+    def newest_page_then_fail(query, **kwargs):
+        yield list(fetch(query, page_size=10))[-1]
+        raise RuntimeError("page request failed")
+
+    monkeypatch.setattr(aws, "iter_query_frames", newest_page_then_fail)
+    with pytest.raises(RuntimeError):
+        aws.sync_raw_history("fridge-a", start, END)
+    monkeypatch.setattr(aws, "iter_query_frames", fetch)
+    aws.sync_raw_history("fridge-a", start, END)
+
+    # one reading a minute
+    assert len(_stored(start, END)) == 2 * 60 + 1
+
+
+def test_top_up_without_new_readings_sends_no_query(fake_timestream):
+    # The window ends between two readings
+    end = END - timedelta(seconds=30)
+    aws.sync_raw_history("fridge-a", end - timedelta(hours=1), end)
+    before = len(fake_timestream.queries)
+
+    aws.sync_raw_history("fridge-a", end - timedelta(hours=1), end)
+
+    assert len(fake_timestream.queries) == before
@@ -0,0 +1,29 @@
+# tests/test_poller.py
+import threading
+import time
+
+from utils import poller
+
+
+def test_resume_after_idle_polls_once(monkeypatch):
+    calls = []
+
+    def slow_fetch():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"fridge-a": {"temp": 38.0}}
+
+    monkeypatch.setattr(poller, "fetch_latest_data_for_all_fridges", slow_fetch)
+    status = poller.StatusPoller()
+    status._last_read = time.monotonic() - 3600
+
+    # Sessions reading the paused poller at the same time
+    snapshots = []
+    readers = [threading.Thread(target=lambda: snapshots.append(status.snapshot())) for _ in range(8)]
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join()
+
+    assert len(calls) == 1
+    assert all(snapshot.latest["fridge-a"]["temp"] == 38.0 for snapshot in snapshots)
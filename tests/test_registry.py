@@ -0,0 +1,8 @@
+# tests/test_registry.py
+from utils.registry import get_registry
+
+
+def test_registry_loads_outside_the_repository(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    assert len(get_registry()) > 0
@@ -1,19 +1,48 @@
+import logging
+import threading
+import time
+
 import boto3
+from botocore.config import Config
 import streamlit as st
 import pandas as pd
-from datetime import datetime
+import pyarrow as pa
+from datetime import datetime, timezone
 import config
+from utils import store
+from utils.budget import governor, EXCEEDED
+from utils.buckets import BucketCache, bucket_starts, contiguous_runs
+from utils.concurrency import run_concurrently
+from utils.registry import get_registry
+from utils.telemetry import QueryStats, current_session_id, record_query, tracked_cache_data
+from utils.queries import select_query, time_between, time_since, equals, in_list, to_epoch_ms
 
 # -- AWS Session Handling -----------------------------------------------------
+logger = logging.getLogger(__name__)
+
 _boto3_session = None
 
+# One Timestream client per process: botocore clients are thread-safe, keep
+# their HTTP connection pool alive and cache discovered endpoints until they
+# expire, so reusing one avoids rebuilding all of that on every query.
+_timestream_client = None
+_client_key = None
+_client_lock = threading.Lock()
+
+
+def _session_key(boto3_session):
+    """Identify a session by its credentials and region (sessions are recreated per rerun)."""
+    credentials = boto3_session.get_credentials()
+    return (credentials.access_key if credentials else None, boto3_session.region_name)
+
+
 def set_aws_session(boto3_session):
     """
     Set the AWS session for the app and validate credentials via STS.
     The session should be created server-side (e.g., from Streamlit Secrets)
     and initialized once at startup in main.py.
     """
-    global _boto3_session
+    global _boto3_session, _timestream_client, _client_key
     try:
         sts = boto3_session.client("sts")
         sts.get_caller_identity()
@@ -24,11 +53,34 @@ def set_aws_session(boto3_session):
         )
         st.stop()
 
-    _boto3_session = boto3_session
+    with _client_lock:
+        key = _session_key(boto3_session)
+        if key != _client_key:
+            _timestream_client = None
+            _client_key = key
+        _boto3_session = boto3_session
+
+
+@st.cache_resource(show_spinner=False)
+def init_aws_session(access_key_id, secret_access_key, region_name):
+    """
+    Create and validate the app's boto3 session once per process.
+
+    Later reruns with the same credentials return immediately instead of
+    building a new session and calling STS again.
+    """
+    session = boto3.Session(
+        aws_access_key_id=access_key_id,
+        aws_secret_access_key=secret_access_key,
+        region_name=region_name
+    )
+    set_aws_session(session)
+    return session
 
 
 def get_timestream_client():
-    """Return a Timestream Query client from the initialized session."""
+    """Return the shared Timestream Query client for the initialized session."""
+    global _timestream_client
     if _boto3_session is None:
         st.error(
             "AWS session is not initialized. This app expects credentials to be "
@@ -36,101 +88,731 @@ def get_timestream_client():
         )
         st.stop()
 
-    return _boto3_session.client("timestream-query")
+    with _client_lock:
+        if _timestream_client is None:
+            _timestream_client = _boto3_session.client(
+                "timestream-query",
+                config=Config(
+                    max_pool_connections=config.TIMESTREAM_MAX_POOL_CONNECTIONS,
+                    retries={
+                        "mode": config.TIMESTREAM_RETRY_MODE,
+                        "max_attempts": config.TIMESTREAM_MAX_ATTEMPTS,
+                    },
+                    endpoint_discovery_enabled=True,
+                ),
+            )
+        return _timestream_client
 
 # -- Query Execution ----------------------------------------------------------
-@st.cache_data(ttl=config.REFRESH_RATE)
-def query_timestream(query: str):
-    """Execute a query against AWS Timestream using the configured session."""
+def iter_query_pages(query: str, max_rows=None, max_bytes=None, page_size=None, label="query"):
+    """
+    Yield raw Timestream result pages as they arrive, following NextToken.
+
+    Iteration stops once the result is exhausted, or early when ``max_rows``
+    rows have been yielded or ``max_bytes`` (CumulativeBytesScanned) has been
+    reached. Errors are raised to the caller; the last page is trimmed so the
+    row limit is exact. Latency, pages, rows and bytes scanned/metered are
+    recorded under ``label`` (see utils.telemetry).
+    """
     client = get_timestream_client()
+    kwargs = {"QueryString": query}
+    if page_size:
+        kwargs["MaxRows"] = page_size
+
+    stats = QueryStats(label=label, session_id=current_session_id())
+    rows_seen = 0
+    next_token = None
+    query_id = None
     try:
-        return client.query(QueryString=query)
+        while True:
+            if next_token:
+                kwargs["NextToken"] = next_token
+            request_started = time.perf_counter()
+            page = client.query(**kwargs)
+            stats.latency_ms += (time.perf_counter() - request_started) * 1000
+
+            query_id = page.get("QueryId", query_id)
+            next_token = page.get("NextToken")
+            status = page.get("QueryStatus", {})
+            stats.query_id = query_id
+            stats.pages += 1
+            stats.bytes_scanned = status.get("CumulativeBytesScanned", stats.bytes_scanned)
+            stats.bytes_metered = status.get("CumulativeBytesMetered", stats.bytes_metered)
+
+            rows = page.get("Rows", [])
+            if max_rows is not None and rows_seen + len(rows) >= max_rows:
+                page = dict(page, Rows=rows[: max_rows - rows_seen])
+                rows_seen = max_rows
+                yield page
+                return
+
+            rows_seen += len(rows)
+            # Timestream may hand back empty pages while the query is running.
+            if rows or not next_token:
+                yield page
+
+            if not next_token or (max_bytes is not None and stats.bytes_scanned >= max_bytes):
+                return
+    except Exception as e:
+        stats.error = str(e)
+        raise
+    finally:
+        # Release server-side resources when we stop before the last page.
+        if next_token and query_id:
+            try:
+                client.cancel_query(QueryId=query_id)
+            except Exception:
+                pass
+        stats.rows = rows_seen
+        record_query(stats)
+
+
+def iter_query_frames(query: str, max_rows=None, max_bytes=None, page_size=None, label="query"):
+    """Yield one parsed DataFrame per Timestream result page."""
+    pages = iter_query_pages(query, max_rows=max_rows, max_bytes=max_bytes, page_size=page_size, label=label)
+    for page in pages:
+        yield parse_query_result(page)
+
+
+def iter_query_tables(query: str, max_rows=None, max_bytes=None, page_size=None, label="query"):
+    """Yield one Arrow table per Timestream result page (for writers that take Arrow)."""
+    pages = iter_query_pages(query, max_rows=max_rows, max_bytes=max_bytes, page_size=page_size, label=label)
+    for page in pages:
+        table = query_result_table(page)
+        if table is not None:
+            yield table
+
+
+def _merge_pages(pages):
+    """Concatenate the rows of several result pages into a single result."""
+    merged = None
+    for page in pages:
+        if merged is None:
+            merged = {
+                "QueryId": page.get("QueryId"),
+                "ColumnInfo": page.get("ColumnInfo", []),
+                "Rows": [],
+            }
+        merged["Rows"].extend(page.get("Rows", []))
+        merged["QueryStatus"] = page.get("QueryStatus", {})
+    return merged
+
+
+@tracked_cache_data("query_timestream", ttl=config.REFRESH_RATE)
+def query_timestream(query: str, max_rows=None, max_bytes=None, label="query"):
+    """Execute a query against AWS Timestream and return every result page merged."""
+    try:
+        return _merge_pages(iter_query_pages(query, max_rows=max_rows, max_bytes=max_bytes, label=label))
     except Exception as e:
         st.error(f"Error querying Timestream: {e}")
         return None
 
 # -- Result Parsing -----------------------------------------------------------
+# Timestream scalar types mapped to the Arrow type each column is decoded into.
+_ARROW_TYPES = {
+    "DOUBLE": pa.float64(),
+    "BIGINT": pa.int64(),
+    "INTEGER": pa.int64(),
+    "BOOLEAN": pa.bool_(),
+    "TIMESTAMP": pa.timestamp("ns"),
+    "DATE": pa.date32(),
+    "VARCHAR": pa.string(),
+}
+
+# Keep strings Arrow-backed; numbers and timestamps convert to numpy (NaN/NaT).
+_PANDAS_TYPES = {pa.string(): pd.StringDtype("pyarrow")}.get
+
+
+def _decode_column(values, column_info):
+    """Decode one column of ScalarValue strings into a typed Arrow array."""
+    raw = pa.array(values, type=pa.string())
+    arrow_type = _ARROW_TYPES.get(column_info.get("Type", {}).get("ScalarType"), pa.string())
+    try:
+        return raw.cast(arrow_type)
+    except pa.ArrowInvalid:
+        decoded = coerce_column(raw, arrow_type)
+        logger.warning(
+            "Column %s: %d cell(s) not parseable as %s, decoded as null",
+            column_info.get("Name"), decoded.null_count - raw.null_count, arrow_type,
+        )
+        return decoded
+
+
+def coerce_column(raw, arrow_type):
+    """Convert an Arrow array cell by cell; cells that do not parse become nulls."""
+    cells = pd.Series(raw.to_pylist(), dtype=object)
+    if pa.types.is_timestamp(arrow_type) or pa.types.is_date(arrow_type):
+        parsed = pd.to_datetime(cells, errors="coerce", format="ISO8601")
+    elif pa.types.is_boolean(arrow_type):
+        parsed = cells.str.lower().map({"true": True, "false": False})
+    else:
+        parsed = pd.to_numeric(cells, errors="coerce")
+    return pa.array(parsed, from_pandas=True).cast(arrow_type, safe=False)
+
+
 def parse_query_result(result):
-    """Parse Timestream query results into a pandas DataFrame."""
-    if not result or "ColumnInfo" not in result:
+    """
+    Parse a Timestream result (or a single page) into a typed DataFrame.
+
+    Columns are decoded according to their ColumnInfo type in one pass:
+    DOUBLE/BIGINT become float/int, TIMESTAMP becomes datetime64 and nulls
+    are kept as NaN/NaT rather than strings.
+    """
+    table = query_result_table(result)
+    if table is None:
         return pd.DataFrame()
+    return table.to_pandas(types_mapper=_PANDAS_TYPES)
 
-    columns = [col["Name"] for col in result["ColumnInfo"]]
-    rows = []
 
-    for row in result.get("Rows", []):
-        parsed = []
-        for cell in row.get("Data", []):
-            if "ScalarValue" in cell:
-                parsed.append(cell["ScalarValue"])
-            elif "NullValue" in cell:
-                parsed.append(None)
-            else:
-                parsed.append(None)
-        rows.append(parsed)
+def query_result_table(result):
+    """Decode a Timestream result (or page) into an Arrow table; None without ColumnInfo."""
+    if not result or "ColumnInfo" not in result:
+        return None
 
-    return pd.DataFrame(rows, columns=columns)
+    column_info = result["ColumnInfo"]
+    names = [col["Name"] for col in column_info]
+    rows = [
+        [cell.get("ScalarValue") for cell in row.get("Data", [])]
+        for row in result.get("Rows", [])
+    ]
+    columns = list(zip(*rows)) if rows else [()] * len(names)
+
+    return pa.table(
+        [_decode_column(values, info) for values, info in zip(columns, column_info)],
+        names=names,
+    )
+
+
+def _clean_record(record):
+    """Map NaN/NaT values of a parsed row back to None."""
+    return {k: (None if pd.isna(v) else v) for k, v in record.items()}
 
 # -- Convenience Functions ----------------------------------------------------
-@st.cache_data(ttl=config.REFRESH_RATE)
-def get_latest_data_for_all_fridges():
-    """Get latest data for all fridges (last 24 hours)."""
-    query = f"""
-    SELECT fridge_id, est_time, temp, door_usage, time
-    FROM "{config.DATABASE_NAME}"."{config.TABLE_NAME}"
-    WHERE time > ago(24h)
-    ORDER BY time DESC
-    """
-    result = query_timestream(query)
-    df = parse_query_result(result)
+def _latest_for_all_fridges_query():
+    return select_query(
+        [
+            "fridge_id",
+            "max_by(est_time, time) AS est_time",
+            "max_by(temp, time) AS temp",
+            "max_by(door_usage, time) AS door_usage",
+            "max(time) AS time",
+        ],
+        time_since(config.LATEST_LOOKBACK_HOURS),
+        where=[in_list("fridge_id", get_registry().sites["fridge_id"])],
+        group_by=["fridge_id"],
+    )
 
+
+def _latest_by_fridge(df):
     if df.empty or "fridge_id" not in df.columns:
         return {}
 
-    latest = {}
-    for fridge in config.FRIDGE_OPTIONS.values():
-        sub = df[df["fridge_id"] == fridge]
-        if not sub.empty:
-            latest[fridge] = sub.iloc[0].to_dict()
-    return latest
-
-@st.cache_data(ttl=config.REFRESH_RATE)
-def get_latest_data_for_fridge(fridge_id):
-    """Get latest data for a specific fridge."""
-    query = f"""
-    SELECT fridge_id, est_time, temp, door_usage, time
-    FROM "{config.DATABASE_NAME}"."{config.TABLE_NAME}"
-    WHERE fridge_id = '{fridge_id}'
-    ORDER BY time DESC
-    LIMIT 1
-    """
-    result = query_timestream(query)
-    df = parse_query_result(result)
-    return df.iloc[0].to_dict() if not df.empty else None
-
-@st.cache_data(ttl=config.REFRESH_RATE)
-def get_historical_data_for_fridge(fridge_id, start_datetime, end_datetime):
-    """Get historical data for a fridge in a time range."""
-    start_str = start_datetime.strftime("%m/%d/%Y, %I:%M:%S %p")
-    end_str   = end_datetime.strftime("%m/%d/%Y, %I:%M:%S %p")
-
-    query = f"""
-    SELECT est_time, temp, door_usage, fridge_id, region, time
-    FROM "{config.DATABASE_NAME}"."{config.TABLE_NAME}"
-    WHERE fridge_id = '{fridge_id}'
-      AND parse_datetime(est_time, 'MM/dd/yyyy, hh:mm:ss a')
-          BETWEEN parse_datetime('{start_str}', 'MM/dd/yyyy, hh:mm:ss a')
-              AND parse_datetime('{end_str}', 'MM/dd/yyyy, hh:mm:ss a')
-    ORDER BY time DESC
-    """
-    result = query_timestream(query)
-    df = parse_query_result(result)
+    records = map(_clean_record, df.to_dict("records"))
+    return {record["fridge_id"]: record for record in records}
 
-    if df.empty:
+
+def fetch_latest_data_for_all_fridges():
+    """
+    Uncached variant of get_latest_data_for_all_fridges for background use.
+
+    Makes no Streamlit calls and raises on query errors.
+    """
+    if _boto3_session is None:
+        raise RuntimeError("AWS session is not initialized.")
+    result = _merge_pages(iter_query_pages(_latest_for_all_fridges_query(), label="latest_all"))
+    return _latest_by_fridge(parse_query_result(result))
+
+
+@tracked_cache_data("get_latest_data_for_all_fridges", ttl=config.REFRESH_RATE)
+def get_latest_data_for_all_fridges():
+    """Get the latest reading of every fridge (last 24 hours), one row per fridge."""
+    result = query_timestream(_latest_for_all_fridges_query(), label="latest_all")
+    return _latest_by_fridge(parse_query_result(result))
+
+# -- Local Store Sync ---------------------------------------------------------
+_RAW_COLUMNS = ["est_time", "temp", "door_usage", "fridge_id", "region", "time"]
+_NS_PER_MS = 1_000_000
+
+
+def _raw_query(fridge_id, start_ms, end_ms):
+    return select_query(
+        _RAW_COLUMNS,
+        time_between(start_ms, end_ms),
+        where=[equals("fridge_id", fridge_id)],
+    )
+
+
+def _fetch_into_store(fridge_id, start_ms, end_ms, extend_coverage=False):
+    """
+    Stream raw readings for a time range into the local store, page by page.
+    The covered range and watermark only move once every page is stored.
+    """
+    for page in iter_query_frames(_raw_query(fridge_id, start_ms, end_ms), label="history_raw"):
+        store.append_readings(fridge_id, page)
+    store.append_readings(
+        fridge_id, None,
+        covered_from_ns=start_ms * _NS_PER_MS if extend_coverage else None,
+        fetched_to_ns=end_ms * _NS_PER_MS,
+    )
+
+
+def _fetch_raw(fridge_id, start_ms, end_ms):
+    """Raw readings of a window straight from Timestream (not stored), newest first."""
+    frames = list(iter_query_frames(_raw_query(fridge_id, start_ms, end_ms), label="history_raw"))
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=_RAW_COLUMNS)
+    return pd.concat(frames, ignore_index=True).sort_values("time", ascending=False, ignore_index=True)
+
+
+def sync_raw_history(fridge_id, start_datetime, end_datetime):
+    """
+    Make sure the local store holds every raw reading of a window.
+
+    The store holds one contiguous range per fridge. Only the missing parts
+    are requested from Timestream: older data when the window starts before
+    what we already hold, and rows newer than the high-water mark (the end
+    of the last completed fetch). Gaps are bounded by HISTORY_RAW_WINDOW_HOURS: a window ending
+    further back than that before the stored range is not stored (returns
+    False; query it with _fetch_raw), and one starting further than that
+    after it restarts the range at the window instead of filling the gap.
+    """
+    start_ms, end_ms = to_epoch_ms(start_datetime), to_epoch_ms(end_datetime)
+    max_gap_ns = int(config.HISTORY_RAW_WINDOW_HOURS * 3_600_000) * _NS_PER_MS
+
+    with store.fridge_lock(fridge_id):
+        covered_from = store.get_coverage_start(fridge_id)
+        if covered_from is not None:
+            if end_ms * _NS_PER_MS < covered_from - max_gap_ns:
+                return False
+            covered_to = max(store.get_watermark(fridge_id) or covered_from, covered_from)
+            if start_ms * _NS_PER_MS > covered_to + max_gap_ns:
+                # Drop the old range rather than backfilling up to this window
+                store.prune(fridge_id, start_ms * _NS_PER_MS)
+                covered_from = start_ms * _NS_PER_MS
+
+        if covered_from is None:
+            _fetch_into_store(fridge_id, start_ms, end_ms, extend_coverage=True)
+        else:
+            if start_ms * _NS_PER_MS < covered_from:
+                _fetch_into_store(fridge_id, start_ms, covered_from // _NS_PER_MS, extend_coverage=True)
+            watermark = max(store.get_watermark(fridge_id) or covered_from, covered_from)
+            if watermark < end_ms * _NS_PER_MS:
+                _fetch_into_store(fridge_id, watermark // _NS_PER_MS, end_ms)
+
+        retention_ms = config.LOCAL_STORE_RETENTION_DAYS * 86_400_000
+        store.prune(fridge_id, (end_ms - retention_ms) * _NS_PER_MS)
+    return True
+
+
+# Hourly rollup query: per-bucket count/sum/min/max (see store.append_hourly_rollups)
+_ROLLUP_SELECT = [
+    "bin(time, 1h) AS time",
+    "count(*) AS samples",
+    "count(temp) AS temp_count",
+    "sum(temp) AS temp_sum",
+    "min(temp) AS temp_min",
+    "max(temp) AS temp_max",
+    "count(door_usage) AS door_count",
+    "sum(door_usage) AS door_sum",
+    "max(door_usage) AS door_max",
+]
+_HOUR_MS = 3_600_000
+
+
+def _fetch_rollups(fridge_id, start_ms, end_ms):
+    """Aggregate a time range into hourly rollups on the server."""
+    query = select_query(
+        _ROLLUP_SELECT,
+        time_between(start_ms, end_ms),
+        where=[equals("fridge_id", fridge_id)],
+        group_by=["bin(time, 1h)"],
+    )
+    return parse_query_result(_merge_pages(iter_query_pages(query, label="rollup_hourly")))
+
+
+def sync_rollups(fridge_id, start_datetime, end_datetime, on_slice=None):
+    """
+    Make sure the local rollups cover a window.
+
+    The window is split into epoch-aligned slices of ROLLUP_SLICE_DAYS,
+    fetched in parallel and stored as each one finishes (``on_slice()`` is
+    called after every slice but the last). Complete slices are fetched only
+    once; the slice holding the newest stored hour is only topped up from
+    that hour on. A failed slice does not stop the others from being stored;
+    the first error is raised once they are.
+    """
+    span_ms = config.ROLLUP_SLICE_DAYS * 86_400_000
+    start_ms = to_epoch_ms(start_datetime) // _HOUR_MS * _HOUR_MS
+    end_ms = to_epoch_ms(end_datetime)
+
+    with store.fridge_lock(fridge_id):
+        starts = bucket_starts(start_ms, end_ms, span_ms)
+        done = store.get_rollup_slices(fridge_id, starts[0] * _NS_PER_MS, starts[-1] * _NS_PER_MS)
+        watermark = store.get_rollup_watermark(fridge_id)
+        watermark_ms = watermark // _NS_PER_MS if watermark is not None else None
+
+        slices = []
+        for start in starts:
+            last_ms = start + span_ms - 1
+            complete = last_ms < end_ms
+            if complete and start * _NS_PER_MS in done:
+                continue
+            fetch_from = watermark_ms if watermark_ms is not None and start <= watermark_ms <= last_ms else start
+            slices.append((start, fetch_from, min(last_ms, end_ms), complete))
+
+        def fetch(s):
+            try:
+                return _fetch_rollups(fridge_id, s[1], s[2])
+            except Exception as e:
+                return e
+
+        errors = []
+        results = run_concurrently(fetch, slices)
+        for finished, ((start, _, _, complete), df) in enumerate(results, 1):
+            if isinstance(df, Exception):
+                errors.append(df)
+            else:
+                store.append_hourly_rollups(
+                    fridge_id, df, complete_slice_ns=start * _NS_PER_MS if complete else None
+                )
+            if on_slice and finished < len(slices):
+                on_slice()
+
+        retention_ms = config.LOCAL_ROLLUP_RETENTION_DAYS * 86_400_000
+        store.prune_rollups(fridge_id, (end_ms - retention_ms) * _NS_PER_MS)
+    if errors:
+        raise errors[0]
+
+
+def _read_raw(fridge_id, start_datetime, end_datetime):
+    """Raw readings of a window, newest first: from the local store, or straight from Timestream."""
+    start_ms, end_ms = to_epoch_ms(start_datetime), to_epoch_ms(end_datetime)
+    try:
+        stored = sync_raw_history(fridge_id, start_datetime, end_datetime)
+        df = None if stored else _fetch_raw(fridge_id, start_ms, end_ms)
+    except Exception as e:
+        st.error(f"Error querying Timestream: {e}")
+        df = None
+    if df is None:
+        df = store.read_readings(fridge_id, start_ms * _NS_PER_MS, end_ms * _NS_PER_MS)
+    return df
+
+
+def _utc(ms):
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+
+
+# Raw readings of the first, partial hour of stats windows: (fridge_id, hour_ms)
+_edge_hours = BucketCache("stats_edge_hours", config.HISTORY_BUCKET_CACHE_ENTRIES)
+
+
+def get_history_stats(fridge_id, start_datetime, end_datetime):
+    """
+    Temperature and door-usage summary of a window: temp_avg/max/min,
+    door_total/max/avg. None without data.
+
+    Windows short enough to be charted from raw readings are summarized from
+    those same readings. Wider ones use the local rollups for the whole hours
+    and raw readings for the partial hours at either edge, so the stats cover
+    exactly the charted window. The newest edge comes from the raw store, the
+    oldest from a per-hour cache.
+    """
+    if choose_bin_width(start_datetime, end_datetime) is None:
+        return store.summarize_totals([store.reading_totals(_read_raw(fridge_id, start_datetime, end_datetime))])
+
+    start_ms, end_ms = to_epoch_ms(start_datetime), to_epoch_ms(end_datetime)
+    first_hour = -(-start_ms // _HOUR_MS) * _HOUR_MS
+    last_hour = end_ms // _HOUR_MS * _HOUR_MS
+    try:
+        sync_rollups(fridge_id, start_datetime, end_datetime)
+    except Exception as e:
+        st.error(f"Error querying Timestream: {e}")
+
+    # The newest edge first: it is the one the raw store follows
+    parts = [
+        store.reading_totals(_read_raw(fridge_id, _utc(last_hour), _utc(end_ms))),
+        store.rollup_totals(fridge_id, first_hour * _NS_PER_MS, last_hour * _NS_PER_MS),
+    ]
+    if start_ms < first_hour:
+        try:
+            hour = _edge_hour_readings(fridge_id, first_hour - _HOUR_MS)
+            parts.append(store.reading_totals(hour[hour["time"] >= pd.Timestamp(start_ms, unit="ms")]))
+        except Exception as e:
+            st.error(f"Error querying Timestream: {e}")
+    return store.summarize_totals(parts)
+
+
+def _edge_hour_readings(fridge_id, hour_ms):
+    """
+    Raw readings of the whole hour holding a stats window's start, cached by
+    hour: the start moves on every refresh, the hour only once an hour.
+    """
+    key = (fridge_id, hour_ms)
+    df = _edge_hours.get(key)
+    if df is None:
+        df = _fetch_raw(fridge_id, hour_ms, hour_ms + _HOUR_MS - 1)
+        _edge_hours.put(key, df)
+    return df
+
+
+# Bin widths offered to Timestream's bin(), as (seconds, duration literal).
+_BIN_WIDTHS = [
+    (60, "1m"), (300, "5m"), (900, "15m"), (1800, "30m"),
+    (3600, "1h"), (10800, "3h"), (21600, "6h"), (43200, "12h"), (86400, "1d"),
+]
+
+
+def choose_bin_width(start_datetime, end_datetime, max_points=None):
+    """
+    Pick the bin width (in seconds) for a history window.
+
+    Returns None when the window is short enough to be shown as raw readings,
+    otherwise the smallest supported width that keeps the window within
+    ``max_points`` bins.
+    """
+    window = (end_datetime - start_datetime).total_seconds()
+    if window <= config.HISTORY_RAW_WINDOW_HOURS * 3600:
+        return None
+
+    max_points = max_points or config.HISTORY_MAX_POINTS
+    for seconds, _ in _BIN_WIDTHS:
+        if window / seconds <= max_points:
+            return seconds
+    return _BIN_WIDTHS[-1][0]
+
+
+def _bin_literal(bin_width):
+    """Return the Timestream duration literal for a bin width in seconds."""
+    for seconds, literal in _BIN_WIDTHS:
+        if seconds == bin_width:
+            return literal
+    return f"{int(bin_width)}s"
+
+
+def _to_local_time(series):
+    """Convert UTC Timestream timestamps to naive local (fridge) time."""
+    return (
+        pd.to_datetime(series)
+        .dt.tz_localize("UTC")
+        .dt.tz_convert(config.LOCAL_TIMEZONE)
+        .dt.tz_localize(None)
+    )
+
+
+# Binned history cache: (fridge_id, bin_width, bucket_start_ms[, "partial"])
+# -> rows of that bucket, newest first.
+_history_buckets = BucketCache("history_buckets", config.HISTORY_BUCKET_CACHE_ENTRIES)
+
+
+def clear_history_cache():
+    """Drop every cached history bucket and stats edge hour."""
+    _history_buckets.clear()
+    _edge_hours.clear()
+
+
+def _binned_query(fridge_id, bin_width, start_ms, end_ms):
+    """Bins of one fridge, or of a tuple of fridges aggregated together."""
+    binned_time = f"bin(time, {_bin_literal(bin_width)})"
+    if isinstance(fridge_id, tuple):
+        fridge_filter = in_list("fridge_id", fridge_id)
+    else:
+        fridge_filter = equals("fridge_id", fridge_id)
+    return select_query(
+        [
+            f"{binned_time} AS time",
+            "avg(temp) AS temp",
+            "min(temp) AS temp_min",
+            "max(temp) AS temp_max",
+            "sum(door_usage) AS door_usage",
+            "max(door_usage) AS door_max",
+            "count(*) AS samples",
+        ],
+        time_between(start_ms, end_ms),
+        where=[fridge_filter],
+        group_by=[binned_time],
+        order_by=["1 DESC"],
+    )
+
+
+def _fetch_binned(fridge_id, bin_width, start_ms, end_ms):
+    """Binned rows for [start_ms, end_ms], or None if the query failed."""
+    result = query_timestream(_binned_query(fridge_id, bin_width, start_ms, end_ms), label="history_binned")
+    return parse_query_result(result) if result is not None else None
+
+
+def _split_buckets(df, starts, span_ms):
+    """{bucket_start: rows} for every start in ``starts`` (empty frames included)."""
+    keys = df["time"].astype("int64") // _NS_PER_MS // span_ms * span_ms
+    groups = dict(tuple(df.groupby(keys.to_numpy(), sort=False)))
+    return {start: groups.get(start, df.iloc[0:0]) for start in starts}
+
+
+def _assemble_buckets(buckets, starts, start_ms, end_ms, bin_width):
+    """Concatenate the buckets of a window, newest first, trimmed to its bins."""
+    frames = [buckets[b] for b in reversed(starts) if buckets.get(b) is not None]
+    frames = [f for f in frames if not f.empty]
+    if not frames:
         return pd.DataFrame()
 
-    df["display_time"] = df["est_time"]
-    df["est_time_dt"] = pd.to_datetime(
-        df["est_time"], format="%m/%d/%Y, %I:%M:%S %p", errors="coerce"
+    df = pd.concat(frames, ignore_index=True)
+    first_bin = pd.Timestamp((start_ms - start_ms % (bin_width * 1000)) * _NS_PER_MS)
+    df = df[(df["time"] >= first_bin) & (df["time"] <= pd.Timestamp(end_ms * _NS_PER_MS))]
+    return df.reset_index(drop=True)
+
+
+def _binned_history(fridge_id, start_datetime, end_datetime, bin_width, on_progress=None):
+    """
+    Binned history assembled from aligned buckets of HISTORY_BUCKET_BINS bins.
+
+    Complete buckets are cached for the life of the process; missing ones are
+    fetched in parallel slices of up to HISTORY_SLICE_BUCKETS buckets. The
+    newest, still-filling bucket is fetched on every call (or reused as-is
+    once the query budget is spent). ``on_progress(df)`` receives the window
+    as assembled so far after every slice but the last. The window start is
+    snapped down to a bin boundary. ``fridge_id`` may be a tuple of ids,
+    binned together.
+    """
+    span_ms = bin_width * config.HISTORY_BUCKET_BINS * 1000
+    start_ms, end_ms = to_epoch_ms(start_datetime), to_epoch_ms(end_datetime)
+    starts = bucket_starts(start_ms, end_ms, span_ms)
+    complete = [b for b in starts if b + span_ms <= end_ms]
+
+    buckets = {b: _history_buckets.get((fridge_id, bin_width, b)) for b in complete}
+    missing = [b for b in complete if buckets[b] is None]
+    # (first ms, last ms, bucket starts or None for the newest bucket)
+    slices = [
+        (run_start, run_end - 1, range(run_start, run_end, span_ms))
+        for run_start, run_end in contiguous_runs(missing, span_ms, config.HISTORY_SLICE_BUCKETS)
+    ]
+
+    stale = False
+    for b in starts[len(complete):]:
+        previous = _history_buckets.get((fridge_id, bin_width, b, "partial"))
+        buckets[b] = previous
+        if previous is not None and governor.level(label="history_binned") == EXCEEDED:
+            stale = True
+        else:
+            slices.append((b, end_ms, None))
+
+    results = run_concurrently(lambda s: _fetch_binned(fridge_id, bin_width, s[0], s[1]), slices)
+    for finished, ((first, _, run_starts), df) in enumerate(results, 1):
+        if df is not None:
+            if run_starts is None:
+                _history_buckets.put((fridge_id, bin_width, first, "partial"), df)
+                buckets[first] = df
+            else:
+                for b, rows in _split_buckets(df, run_starts, span_ms).items():
+                    _history_buckets.put((fridge_id, bin_width, b), rows)
+                    buckets[b] = rows
+        if on_progress and finished < len(slices):
+            on_progress(_assemble_buckets(buckets, starts, start_ms, end_ms, bin_width))
+
+    df = _assemble_buckets(buckets, starts, start_ms, end_ms, bin_width)
+    if stale:
+        df.attrs["stale"] = True
+    return df
+
+
+def _read_rollup_history(fridge_id, start_datetime, end_datetime, bin_width):
+    start_ms = to_epoch_ms(start_datetime)
+    return store.read_rollup_bins(
+        fridge_id,
+        (start_ms - start_ms % (bin_width * 1000)) * _NS_PER_MS,
+        to_epoch_ms(end_datetime) * _NS_PER_MS,
+        bin_width,
     )
+
+
+def _finish_history(df, fridge_id, bin_width):
+    """Add the display columns to a raw or binned history frame."""
+    if df.empty:
+        return pd.DataFrame()
+
+    if bin_width is None:
+        df["display_time"] = df["est_time"]
+        df["est_time_dt"] = pd.to_datetime(
+            df["est_time"], format="%m/%d/%Y, %I:%M:%S %p", errors="coerce"
+        )
+    else:
+        df["fridge_id"] = fridge_id
+        df["est_time_dt"] = _to_local_time(df["time"])
+        df["display_time"] = df["est_time_dt"].dt.strftime("%m/%d/%Y, %I:%M:%S %p")
+
+    df.attrs["bin_width"] = bin_width
     return df
+
+
+def get_door_activity(start_datetime, end_datetime, fridge_id=None):
+    """
+    Hourly door totals (est_time_dt, door_usage) of one fridge, or summed
+    over every registered fridge when ``fridge_id`` is None.
+
+    One fridge is read from the local rollups; the fleet comes from
+    server-side hourly bins over all fridges, cached per aligned bucket like
+    binned history, so only the newest bucket is queried again.
+    """
+    if fridge_id is None:
+        fleet = tuple(sorted(get_registry().sites["fridge_id"]))
+        df = _binned_history(fleet, start_datetime, end_datetime, store.HOUR_S)
+    else:
+        try:
+            sync_rollups(fridge_id, start_datetime, end_datetime)
+        except Exception as e:
+            st.error(f"Error querying Timestream: {e}")
+        df = _read_rollup_history(fridge_id, start_datetime, end_datetime, store.HOUR_S)
+
+    if df.empty:
+        return pd.DataFrame({
+            "est_time_dt": pd.Series(dtype="datetime64[ns]"),
+            "door_usage": pd.Series(dtype=float),
+        })
+    return pd.DataFrame({
+        "est_time_dt": _to_local_time(df["time"]),
+        "door_usage": df["door_usage"].astype(float),
+    })
+
+
+def get_historical_data_for_fridge(fridge_id, start_datetime, end_datetime,
+                                   max_points=None, bin_width=None, on_progress=None):
+    """
+    Get historical data for a fridge in a time range.
+
+    Short windows return raw readings. Wider windows are aggregated with
+    ``bin(time, ...)`` on the server to roughly ``max_points`` rows: ``temp``
+    is the bin mean (with ``temp_min``/``temp_max``), ``door_usage`` the bin
+    total. Pass ``bin_width`` (seconds) to force a resolution; the width used
+    is stored in ``df.attrs["bin_width"]`` (None for raw data).
+
+    Not wrapped in st.cache_data: callers pass a moving ``now``, so whole
+    windows never repeat. Raw readings come from the local store, whole-hour
+    bins from its rollups and other bins from the bucket cache, so a refresh
+    only queries what is new. Wide windows are fetched in parallel time
+    slices; ``on_progress(df)`` is called with the partial result as slices
+    arrive. Binned results whose newest bucket could not be refreshed within
+    the query budget have ``df.attrs["stale"]`` set.
+    """
+    if bin_width is None:
+        bin_width = choose_bin_width(start_datetime, end_datetime, max_points)
+
+    progress = None
+    if on_progress:
+        progress = lambda partial: on_progress(_finish_history(partial, fridge_id, bin_width))
+
+    if bin_width is None:
+        # Raw readings are served from the local store, topped up incrementally;
+        # windows far older than the stored range are queried directly.
+        df = _read_raw(fridge_id, start_datetime, end_datetime)
+    elif bin_width % store.HOUR_S == 0:
+        # Whole-hour bins are re-aggregated from the local rollups.
+        read = lambda: _read_rollup_history(fridge_id, start_datetime, end_datetime, bin_width)
+        try:
+            sync_rollups(fridge_id, start_datetime, end_datetime,
+                         on_slice=(lambda: progress(read())) if progress else None)
+        except Exception as e:
+            st.error(f"Error querying Timestream: {e}")
+        df = read()
+    else:
+        df = _binned_history(fridge_id, start_datetime, end_datetime, bin_width, on_progress=progress)
+
+    return _finish_history(df, fridge_id, bin_width)
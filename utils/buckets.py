@@ -0,0 +1,59 @@
+# utils/buckets.py
+# Epoch-aligned time buckets for caching range queries. Windows are split on
+# multiples of a fixed span, so overlapping windows share bucket keys and a
+# sliding "last N hours" view only misses on its newest, still-filling bucket.
+import threading
+from collections import OrderedDict
+
+from utils.telemetry import count_cache_lookup
+
+
+def bucket_starts(start_ms, end_ms, span_ms):
+    """Start of every aligned bucket overlapping [start_ms, end_ms]."""
+    first = start_ms - start_ms % span_ms
+    return list(range(first, end_ms + 1, span_ms))
+
+
+def contiguous_runs(starts, span_ms, max_buckets=None):
+    """
+    Group sorted bucket starts into (run_start, run_end) ranges, end
+    exclusive, of at most ``max_buckets`` buckets each.
+    """
+    runs = []
+    for start in starts:
+        if runs and runs[-1][1] == start and (
+            not max_buckets or runs[-1][1] - runs[-1][0] < max_buckets * span_ms
+        ):
+            runs[-1][1] = start + span_ms
+        else:
+            runs.append([start, start + span_ms])
+    return [tuple(run) for run in runs]
+
+
+class BucketCache:
+    """Thread-safe LRU of bucket results; lookups are counted under ``name``."""
+
+    def __init__(self, name, max_entries):
+        self.name = name
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+        count_cache_lookup(self.name, hit=value is not None)
+        return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,120 @@
+# utils/budget.py
+# Cost governor for Timestream queries. Bytes metered by every query (see
+# utils.telemetry) are tracked over a rolling window, per session and for the
+# whole process; callers ask for the current pressure level and degrade
+# accordingly instead of issuing full-price queries on every rerun.
+import threading
+import time
+from collections import deque
+
+import config
+from utils.telemetry import add_listener, current_session_id
+
+OK, TIGHT, EXCEEDED = "ok", "tight", "exceeded"
+
+# Bins get this many times coarser, and auto-refresh this many times slower
+_MAX_POINTS_DIVISOR = {OK: 1, TIGHT: 2, EXCEEDED: 4}
+_REFRESH_MULTIPLIER = {OK: 1, TIGHT: 3, EXCEEDED: 12}
+
+
+class RollingBytes:
+    """Sum of bytes recorded during the last ``window`` seconds."""
+
+    def __init__(self, window):
+        self.window = window
+        self._events = deque()
+        self._total = 0
+
+    def add(self, nbytes, now=None):
+        self._expire(now)
+        self._events.append((now or time.time(), nbytes))
+        self._total += nbytes
+
+    def total(self, now=None):
+        self._expire(now)
+        return self._total
+
+    def _expire(self, now=None):
+        cutoff = (now or time.time()) - self.window
+        while self._events and self._events[0][0] < cutoff:
+            self._total -= self._events.popleft()[1]
+
+
+class BudgetGovernor:
+    """
+    Tracks bytes metered per session and per process and maps usage to a
+    pressure level: OK, TIGHT (past ``soft_limit`` of a budget, counting the
+    expected cost of the next query) or EXCEEDED.
+    """
+
+    def __init__(self, session_budget, process_budget, window, soft_limit):
+        self.session_budget = session_budget
+        self.process_budget = process_budget
+        self.window = window
+        self.soft_limit = soft_limit
+        self._lock = threading.Lock()
+        self._process = RollingBytes(window)
+        self._sessions = {}
+        self._estimates = {}
+
+    # -- accounting -----------------------------------------------------------
+    def record(self, stats):
+        """telemetry listener: account one finished query."""
+        nbytes = stats.bytes_metered or stats.bytes_scanned
+        with self._lock:
+            self._process.add(nbytes)
+            if stats.session_id:
+                self._sessions.setdefault(stats.session_id, RollingBytes(self.window)).add(nbytes)
+            # Running estimate of what the next query with this label costs
+            previous = self._estimates.get(stats.label)
+            self._estimates[stats.label] = nbytes if previous is None else 0.7 * previous + 0.3 * nbytes
+            self._sessions = {sid: w for sid, w in self._sessions.items() if w.total()}
+
+    def estimate(self, label):
+        """Expected bytes of the next query with ``label`` (0 if never seen)."""
+        with self._lock:
+            return self._estimates.get(label, 0)
+
+    def usage(self, session_id=None):
+        """{"session": bytes, "process": bytes} used in the current window."""
+        session_id = session_id or current_session_id()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return {
+                "session": session.total() if session else 0,
+                "process": self._process.total(),
+            }
+
+    def level(self, session_id=None, label=None):
+        """Pressure level for the calling session, optionally before a ``label`` query."""
+        used = self.usage(session_id)
+        upcoming = self.estimate(label) if label else 0
+        ratio = max(
+            (used["session"] + upcoming) / self.session_budget,
+            (used["process"] + upcoming) / self.process_budget,
+        )
+        if ratio >= 1:
+            return EXCEEDED
+        if ratio >= self.soft_limit:
+            return TIGHT
+        return OK
+
+    # -- degradation ----------------------------------------------------------
+    def max_points(self, base=None, session_id=None, label=None):
+        """History resolution to request: fewer points (coarser bins) under pressure."""
+        base = base or config.HISTORY_MAX_POINTS
+        return max(base // _MAX_POINTS_DIVISOR[self.level(session_id, label)], 1)
+
+    def refresh_interval(self, base=None, session_id=None):
+        """Auto-refresh period in seconds, stretched under pressure."""
+        base = base or config.REFRESH_RATE
+        return base * _REFRESH_MULTIPLIER[self.level(session_id)]
+
+
+governor = BudgetGovernor(
+    session_budget=config.SESSION_BYTES_BUDGET,
+    process_budget=config.PROCESS_BYTES_BUDGET,
+    window=config.QUERY_BUDGET_WINDOW_SECONDS,
+    soft_limit=config.BUDGET_SOFT_LIMIT,
+)
+add_listener(governor.record)
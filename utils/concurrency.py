@@ -0,0 +1,45 @@
+# utils/concurrency.py
+# Bounded thread pool for running independent Timestream requests side by side.
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+import config
+
+# Set in pool threads, so nested calls stay within MAX_QUERY_WORKERS
+_worker = threading.local()
+
+
+def run_concurrently(fn, items, max_workers=None):
+    """
+    Call ``fn(item)`` for every item on a bounded thread pool.
+
+    Yields ``(item, result)`` pairs in completion order, so total latency is
+    about that of the slowest call. Workers share the caller's Streamlit
+    script context, which keeps st.cache_data and st.* messages working.
+    Exceptions raised by ``fn`` propagate to the caller. Called from inside
+    a worker, the items run one by one on that worker instead of on a pool
+    of their own.
+    """
+    items = list(items)
+    if not items:
+        return
+
+    if getattr(_worker, "active", False):
+        for item in items:
+            yield item, fn(item)
+        return
+
+    ctx = get_script_run_ctx(suppress_warning=True)
+
+    def _attach_ctx():
+        _worker.active = True
+        if ctx is not None:
+            add_script_run_ctx(ctx=ctx)
+
+    workers = min(max_workers or config.MAX_QUERY_WORKERS, len(items))
+    with ThreadPoolExecutor(max_workers=workers, initializer=_attach_ctx) as pool:
+        futures = {pool.submit(fn, item): item for item in items}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
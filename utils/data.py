@@ -1,21 +1,128 @@
-def determine_fridge_status(temp):
+import numpy as np
+import pandas as pd
+
+import config
+from utils.registry import get_registry
+
+STATUS_COLORS = {"Normal": "green", "Too cold": "blue", "Too warm": "red", "Unknown": "gray"}
+EXCURSION_STATUSES = ["Too warm", "Too cold"]
+
+def get_temp_range(fridge_id=None):
+    """Safe (min, max) temperature of a fridge"""
+    return config.FRIDGE_TEMP_RANGES.get(fridge_id, config.DEFAULT_TEMP_RANGE)
+
+def determine_fridge_status(temp, fridge_id=None):
     """Determine fridge status based on temperature"""
     if temp is None:
-        return "Unknown", "gray"
-    
-    temp = float(temp)
-    if 0 <= temp <= 50:
-        return "Normal", "green"
-    elif temp < 0:
-        return "Too cold", "blue"
-    else:  # temp > 6
-        return "Too warm", "red"
+        return "Unknown", STATUS_COLORS["Unknown"]
+
+    status = str(classify_temperatures([float(temp)], fridge_id=fridge_id)[0])
+    return status, STATUS_COLORS[status]
+
+def classify_temperatures(temps, temps_low=None, fridge_id=None):
+    """
+    Status of every temperature in one vectorized pass.
+
+    ``temps_low`` is checked against the lower bound instead of ``temps``
+    (for binned data: bin minimum vs bin maximum). NaN gives "Unknown".
+    """
+    low, high = get_temp_range(fridge_id)
+    temps_high = np.asarray(temps, dtype=float)
+    temps_low = temps_high if temps_low is None else np.asarray(temps_low, dtype=float)
+    return _classify(temps_high, temps_low, low, high)
+
+def classify_fleet(temps, fridge_ids):
+    """Status of one temperature per fridge, each against its own safe range"""
+    fridge_ids = pd.Series(list(fridge_ids), dtype=object)
+    ranges = config.FRIDGE_TEMP_RANGES
+    default_low, default_high = config.DEFAULT_TEMP_RANGE
+    low = fridge_ids.map({fid: r[0] for fid, r in ranges.items()}).fillna(default_low).to_numpy(dtype=float)
+    high = fridge_ids.map({fid: r[1] for fid, r in ranges.items()}).fillna(default_high).to_numpy(dtype=float)
+    temps = np.asarray(temps, dtype=float)
+    return _classify(temps, temps, low, high)
+
+def _classify(temps_high, temps_low, low, high):
+    return np.select(
+        [np.isnan(temps_high) & np.isnan(temps_low), temps_high > high, temps_low < low],
+        ["Unknown", "Too warm", "Too cold"],
+        default="Normal",
+    )
+
+def classify_history(hist, fridge_id=None):
+    """Status of every row of a history frame (binned rows use temp_max/temp_min)"""
+    if "temp_max" in hist.columns:
+        return classify_temperatures(hist["temp_max"], hist["temp_min"], fridge_id=fridge_id)
+    return classify_temperatures(hist["temp"], fridge_id=fridge_id)
+
+_RUN_COLUMNS = ["status", "start", "end", "duration", "peak_temp", "readings"]
+
+def status_runs(hist, fridge_id=None):
+    """
+    Consecutive rows of a history frame with the same status, oldest first.
+
+    A run ends where the next one starts (or at the last reading); peak_temp
+    is the lowest temperature of a "Too cold" run and the highest otherwise.
+    Linear in the number of rows.
+    """
+    if hist.empty:
+        return pd.DataFrame(columns=_RUN_COLUMNS)
+
+    hist = hist.sort_values("est_time_dt")
+    status = classify_history(hist, fridge_id)
+    times = hist["est_time_dt"].to_numpy()
+    high = hist["temp_max" if "temp_max" in hist.columns else "temp"].to_numpy(dtype=float)
+    low = hist["temp_min" if "temp_min" in hist.columns else "temp"].to_numpy(dtype=float)
+
+    first = np.flatnonzero(np.r_[True, status[1:] != status[:-1]])
+    run_status = status[first]
+    start = times[first]
+    end = np.r_[times[first[1:]], times[-1:]]
+    peak = np.where(
+        run_status == "Too cold",
+        np.fmin.reduceat(low, first),
+        np.fmax.reduceat(high, first),
+    )
+    return pd.DataFrame({
+        "status": run_status,
+        "start": start,
+        "end": end,
+        "duration": end - start,
+        "peak_temp": peak,
+        "readings": np.diff(np.r_[first, len(status)]),
+    })
+
+def find_excursions(hist, fridge_id=None):
+    """Runs outside the fridge's safe range ("Too warm" / "Too cold"), oldest first"""
+    runs = status_runs(hist, fridge_id)
+    return runs[runs["status"].isin(EXCURSION_STATUSES)].reset_index(drop=True)
+
+def get_fridge_options():
+    """{fridge number: fridge_id} for every registered fridge"""
+    return get_registry().options
 
 def get_all_fridge_coordinates():
     """Get all fridge coordinates"""
-    from config import FRIDGE_COORDINATES
-    return FRIDGE_COORDINATES
+    return get_registry().coordinates
 
 def get_fridge_locations():
-    from config import FRIDGE_LOCATIONS
-    return FRIDGE_LOCATIONS
\ No newline at end of file
+    return get_registry().locations
+
+DAYS_OF_WEEK = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+def door_activity_heatmap(hourly):
+    """
+    Mean door activity per hour of a week: 7 rows (Mon..Sun) by 24 columns
+    (hour of day) from hourly totals (est_time_dt, door_usage). Cells with no
+    hours in range are NaN.
+    """
+    times = pd.DatetimeIndex(hourly["est_time_dt"])
+    door = hourly["door_usage"].to_numpy(dtype=float)
+    valid = ~np.isnan(door) & ~times.isna()
+    times, door = times[valid], door[valid]
+    cell = times.dayofweek.to_numpy(dtype=np.int64) * 24 + times.hour.to_numpy(dtype=np.int64)
+
+    totals = np.bincount(cell, weights=door, minlength=7 * 24)
+    hours = np.bincount(cell, minlength=7 * 24)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(hours > 0, totals / hours, np.nan)
+    return pd.DataFrame(means.reshape(7, 24), index=DAYS_OF_WEEK, columns=range(24))
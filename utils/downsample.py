@@ -0,0 +1,84 @@
+# utils/downsample.py
+# Shape-preserving downsampling (Largest-Triangle-Three-Buckets) and WebGL
+# switching for plotly figures, so long histories are sent to the browser as
+# about one point per pixel instead of every reading.
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+_SCATTER_TYPES = ("scatter", "scattergl")
+
+
+def lttb(x, y, n_out):
+    """
+    Indices of the ``n_out`` points kept by Largest-Triangle-Three-Buckets.
+
+    ``x`` must be increasing. The first and last points are always kept; each
+    bucket in between keeps the point forming the largest triangle with the
+    previously kept point and the mean of the next bucket.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    x = x - x[0]
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = (end, edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        cx, cy = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        area = np.abs((x[a] - cx) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (cy - y[a]))
+        a = start + int(area.argmax())
+        kept[i + 1] = a
+    return kept
+
+
+def _as_float(values):
+    """x values as floats (datetimes become epoch nanoseconds)."""
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64) or values.dtype == object:
+        return pd.to_datetime(values).asi8.astype(float)
+    return values.astype(float)
+
+
+def point_count(fig):
+    """Total number of points across the scatter/line traces of a figure."""
+    return sum(len(t.y) for t in fig.data if t.type in _SCATTER_TYPES and t.y is not None)
+
+
+def downsample_figure(fig, max_points):
+    """Reduce every scatter/line trace longer than ``max_points`` with LTTB (in place)."""
+    for trace in fig.data:
+        if trace.type not in _SCATTER_TYPES or trace.x is None or trace.y is None:
+            continue
+        if len(trace.y) <= max_points:
+            continue
+
+        x = np.asarray(trace.x)
+        y = np.asarray(trace.y, dtype=float)
+        valid = np.flatnonzero(~np.isnan(y))
+        keep = valid[lttb(_as_float(x[valid]), y[valid], max_points)]
+
+        updates = {"x": x[keep], "y": y[keep]}
+        if trace.customdata is not None:
+            updates["customdata"] = np.asarray(trace.customdata)[keep]
+        trace.update(updates)
+    return fig
+
+
+def use_webgl(fig):
+    """Swap SVG scatter/line traces for their WebGL (scattergl) equivalent."""
+    # Figure.data only accepts a reordering of its own traces, so rebuild it
+    traces = [
+        go.Scattergl(trace.to_plotly_json(), skip_invalid=True) if trace.type == "scatter" else trace
+        for trace in fig.data
+    ]
+    fig.data = []
+    fig.add_traces(traces)
+    return fig
@@ -0,0 +1,138 @@
+# utils/export.py
+# Bulk export of raw readings to CSV or Parquet. Result pages are decoded to
+# Arrow and appended to a chunked writer on a temp file as they arrive, so
+# memory stays at about one page however long the range is. Temp files are
+# tracked per process and removed after EXPORT_FILE_TTL_SECONDS if the run
+# that made them never discarded them.
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+import config
+from utils.aws import coerce_column, iter_query_tables
+from utils.queries import equals, in_list, select_query, time_between
+
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+_EXPORT_COLUMNS = ["time", "est_time", "fridge_id", "region", "temp", "door_usage"]
+
+logger = logging.getLogger(__name__)
+
+# path -> time.monotonic() when the export file was created
+_export_files = {}
+_export_files_lock = threading.Lock()
+
+
+def export_query(fridge_ids, start_datetime, end_datetime):
+    """Raw readings of some fridges over a window, ordered by fridge then time."""
+    fridge_ids = list(fridge_ids)
+    where = equals("fridge_id", fridge_ids[0]) if len(fridge_ids) == 1 else in_list("fridge_id", fridge_ids)
+    return select_query(
+        _EXPORT_COLUMNS,
+        time_between(start_datetime, end_datetime),
+        where=[where],
+        order_by=["fridge_id", "time"],
+    )
+
+
+def _open_writer(path, fmt, schema):
+    if fmt == "parquet":
+        return pq.ParquetWriter(path, schema, compression="zstd")
+    return pa_csv.CSVWriter(path, schema)
+
+
+def _conform(table, schema):
+    """
+    A table with exactly ``schema``'s columns: missing ones are null, and
+    cells that do not convert to the column type become null.
+    """
+    columns = []
+    for field in schema:
+        if field.name not in table.column_names:
+            columns.append(pa.nulls(table.num_rows, field.type))
+            continue
+        column = table.column(field.name)
+        try:
+            columns.append(column.cast(field.type))
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            converted = coerce_column(column.combine_chunks(), field.type)
+            logger.warning(
+                "Export column %s: %d cell(s) not convertible to %s, written as null",
+                field.name, converted.null_count - column.null_count, field.type,
+            )
+            columns.append(converted)
+    return pa.table(columns, schema=schema)
+
+
+def write_tables(tables, path, fmt, on_progress=None):
+    """
+    Append Arrow tables to a CSV or Parquet file, one chunk per table.
+
+    Every table is conformed to the schema of the first one. Returns the
+    number of rows written; the file is not created when there are no tables.
+    """
+    writer = None
+    rows = 0
+    try:
+        for table in tables:
+            if writer is None:
+                schema = table.schema
+                writer = _open_writer(path, fmt, schema)
+            writer.write_table(_conform(table, schema))
+            rows += table.num_rows
+            if on_progress:
+                on_progress(rows)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def discard_export(path):
+    """Delete an export file made by export_history."""
+    with _export_files_lock:
+        _export_files.pop(path, None)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def sweep_exports(max_age=None):
+    """Delete export files older than ``max_age`` seconds (EXPORT_FILE_TTL_SECONDS)."""
+    max_age = config.EXPORT_FILE_TTL_SECONDS if max_age is None else max_age
+    cutoff = time.monotonic() - max_age
+    with _export_files_lock:
+        expired = [path for path, created in _export_files.items() if created < cutoff]
+    for path in expired:
+        discard_export(path)
+
+
+def export_history(fridge_ids, start_datetime, end_datetime, fmt, on_progress=None):
+    """
+    Stream raw readings into a temp file. Returns (path, rows); path is None
+    when the window holds no readings. The caller deletes the file with
+    discard_export; files it never deletes are swept by later exports.
+    """
+    sweep_exports()
+    fd, path = tempfile.mkstemp(prefix="fridge-export-", suffix=f".{fmt}")
+    os.close(fd)
+    with _export_files_lock:
+        _export_files[path] = time.monotonic()
+    try:
+        tables = iter_query_tables(export_query(fridge_ids, start_datetime, end_datetime), label="export")
+        rows = write_tables(tables, path, fmt, on_progress=on_progress)
+    except Exception:
+        discard_export(path)
+        raise
+    if not rows:
+        discard_export(path)
+        return None, 0
+    return path, rows
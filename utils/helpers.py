@@ -1,15 +1,47 @@
 from datetime import datetime
+from zoneinfo import ZoneInfo
 import streamlit as st
+import config
 
 def unique_key(prefix=""):
     """Generate a unique key for Streamlit elements to avoid duplicate IDs"""
     return f"{prefix}_{datetime.now().timestamp()}_{id(datetime.now())}"
 
-def safe_plotly_chart(fig, use_container_width=True, prefix="plot"):
-    """Display a plotly chart with a guaranteed unique key"""
+def safe_plotly_chart(fig, use_container_width=True, prefix="plot", max_points=None):
+    """
+    Display a plotly chart with a guaranteed unique key.
+
+    Large figures are switched to WebGL and their traces downsampled with
+    LTTB to ``max_points`` points each (default CHART_MAX_POINTS).
+    """
+    from utils.downsample import downsample_figure, point_count, use_webgl
+
+    if point_count(fig) > config.CHART_WEBGL_THRESHOLD:
+        fig = use_webgl(fig)
+    fig = downsample_figure(fig, max_points or config.CHART_MAX_POINTS)
+
     key = unique_key(prefix)
     return st.plotly_chart(fig, use_container_width=use_container_width, key=key)
 
+def local_now():
+    """Current time as a naive datetime in the fridges' local time zone"""
+    return datetime.now(ZoneInfo(config.LOCAL_TIMEZONE)).replace(tzinfo=None)
+
+def format_duration(seconds):
+    """Format a whole number of seconds as a short duration, e.g. 15-minute or 6-hour"""
+    for unit, size in (("day", 86400), ("hour", 3600), ("minute", 60)):
+        if seconds >= size and seconds % size == 0:
+            return f"{seconds // size}-{unit}"
+    return f"{seconds}-second"
+
+def format_bytes(n):
+    """Format a byte count, e.g. 512 B or 3.2 MB"""
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
+
 def create_tooltip(text, tip_text):
     """Create an HTML tooltip"""
     return f"""
@@ -0,0 +1,76 @@
+# utils/maps.py
+# Folium maps rendered once to HTML and memoized on their marker state, so a
+# rerun with unchanged markers reuses the same HTML (and the browser keeps the
+# existing iframe instead of reloading Leaflet). Fleet-wide maps use
+# FastMarkerCluster: sites are shipped as one JS array and markers are built
+# client-side, instead of one folium.Marker (and its own JS block) per site.
+import html
+
+import folium
+from folium.plugins import FastMarkerCluster, MarkerCluster
+import streamlit.components.v1 as components
+
+from utils.telemetry import tracked_cache_data
+
+
+def fridge_marker(lat, lon, popup, tooltip=None, color="blue"):
+    """A hashable marker description: (lat, lon, popup, tooltip, color)."""
+    return (float(lat), float(lon), popup, tooltip, color)
+
+
+@tracked_cache_data("render_map_html", max_entries=64, show_spinner=False)
+def render_map_html(center, zoom_start, markers, cluster=False):
+    """Render a map with snowflake markers to HTML; cached on the marker tuple."""
+    base_map = folium.Map(location=list(center), zoom_start=zoom_start)
+    parent = MarkerCluster().add_to(base_map) if cluster else base_map
+
+    for lat, lon, popup, tooltip, color in markers:
+        folium.Marker(
+            [lat, lon],
+            popup=popup,
+            tooltip=tooltip,
+            icon=folium.Icon(color=color, icon="snowflake", prefix="fa")
+        ).add_to(parent)
+
+    return folium.Figure().add_child(base_map).render()
+
+
+# row = [lat, lon, popup html, color]
+_SITE_CALLBACK = """
+var callback = function (row) {
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {
+        radius: 7, color: row[3], fillColor: row[3], fillOpacity: 0.8
+    });
+    marker.bindPopup(row[2]);
+    return marker;
+};
+"""
+
+
+def site_point(lat, lon, fridge_id, address, status, color):
+    """A hashable fast-cluster row: (lat, lon, popup, color)."""
+    popup = (
+        f"<b>{html.escape(str(fridge_id))}</b><br>{html.escape(str(address))}"
+        f"<br><b>Status:</b> {html.escape(str(status))}"
+    )
+    return (float(lat), float(lon), popup, color)
+
+
+@tracked_cache_data("render_cluster_map_html", max_entries=16, show_spinner=False)
+def render_cluster_map_html(center, zoom_start, points):
+    """Render many sites through a single FastMarkerCluster layer; cached on the points."""
+    base_map = folium.Map(location=list(center), zoom_start=zoom_start)
+    FastMarkerCluster([list(p) for p in points], callback=_SITE_CALLBACK).add_to(base_map)
+    return folium.Figure().add_child(base_map).render()
+
+
+def show_map(center, zoom_start, markers, cluster=False, width=700, height=300):
+    """Display a memoized map (same layout as streamlit_folium.folium_static)."""
+    html_doc = render_map_html(tuple(center), zoom_start, tuple(markers), cluster)
+    components.html(html_doc, height=height + 10, width=width)
+
+
+def show_cluster_map(center, zoom_start, points, width=700, height=300):
+    """Display a memoized fast-cluster map of ``site_point`` rows."""
+    html_doc = render_cluster_map_html(tuple(center), zoom_start, tuple(points))
+    components.html(html_doc, height=height + 10, width=width)
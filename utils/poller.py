@@ -0,0 +1,100 @@
+# utils/poller.py
+# One background thread per server process refreshes the latest status of
+# every fridge and publishes it as an immutable snapshot. Pages read the
+# snapshot instead of querying Timestream, so backend load does not grow with
+# the number of open sessions. With no viewers the poller pauses, and the
+# first read after a pause refreshes the snapshot before returning it (other
+# readers arriving meanwhile wait for that refresh instead of polling too).
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+import streamlit as st
+
+import config
+from utils.aws import fetch_latest_data_for_all_fridges
+from utils.budget import governor
+from utils.helpers import local_now
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class StatusSnapshot:
+    """Latest reading per fridge as of ``taken_at`` (read-only)."""
+    latest: Mapping[str, Mapping] = field(default_factory=lambda: MappingProxyType({}))
+    taken_at: Optional[datetime] = None
+    error: Optional[str] = None
+
+
+class StatusPoller:
+    """Refreshes a StatusSnapshot every ``interval`` seconds on a daemon thread."""
+
+    def __init__(self, interval=config.REFRESH_RATE):
+        self.interval = interval
+        self._snapshot = StatusSnapshot()
+        self._last_read = time.monotonic()
+        # _read_lock: one reader resumes a paused poller, the rest wait for it.
+        # _poll_lock: one poll at a time writes the snapshot.
+        self._read_lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="fridge-status-poller", daemon=True)
+
+    def start(self):
+        # Poll once up front so the first page view has data to show.
+        self.poll()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def snapshot(self):
+        with self._read_lock:
+            now = time.monotonic()
+            paused = self._idle(now)
+            self._last_read = now
+            if paused:
+                self.poll()
+        return self._snapshot
+
+    def _idle(self, now=None):
+        """True when no session has read the snapshot for POLLER_IDLE_SECONDS."""
+        return (now or time.monotonic()) - self._last_read > config.POLLER_IDLE_SECONDS
+
+    def poll(self):
+        with self._poll_lock:
+            try:
+                latest = fetch_latest_data_for_all_fridges()
+            except Exception as e:
+                logger.exception("Status poll failed")
+                # Keep serving the last good readings, but surface the error.
+                previous = self._snapshot
+                self._snapshot = StatusSnapshot(previous.latest, previous.taken_at, str(e))
+                return
+
+            frozen = {fid: MappingProxyType(dict(record)) for fid, record in latest.items()}
+            self._snapshot = StatusSnapshot(MappingProxyType(frozen), local_now())
+
+    def _run(self):
+        # Poll less often while the process is close to its query budget, and
+        # not at all while nobody is reading the snapshot.
+        while not self._stop.wait(governor.refresh_interval(self.interval)):
+            if not self._idle():
+                self.poll()
+
+
+@st.cache_resource
+def get_status_poller():
+    """The process-wide poller, started on first use."""
+    return StatusPoller().start()
+
+
+def get_status_snapshot():
+    """Current status snapshot; reading it never queries Timestream."""
+    return get_status_poller().snapshot()
@@ -0,0 +1,110 @@
+# utils/queries.py
+# Small SQL builder for the Timestream measure table. Every query carries a
+# predicate on the `time` column (so Timestream can prune partitions), values
+# are escaped rather than interpolated, and the text is canonical (single
+# spaces, sorted IN lists) so identical requests share a cache key.
+import math
+import re
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+import config
+
+
+# -- Escaping -----------------------------------------------------------------
+def quote_identifier(name):
+    """Quote a database, table or column name."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def quote_literal(value):
+    """Render a Python value as a SQL literal."""
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float) and not math.isfinite(value):
+        raise ValueError(f"Cannot use non-finite number {value!r} in a query.")
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def table_ref():
+    """Fully qualified reference to the configured measure table."""
+    return f"{quote_identifier(config.DATABASE_NAME)}.{quote_identifier(config.TABLE_NAME)}"
+
+
+# -- Predicates ---------------------------------------------------------------
+def to_epoch_ms(dt):
+    """Epoch milliseconds for a datetime; naive values are taken as local fridge time."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=ZoneInfo(config.LOCAL_TIMEZONE))
+    return int(dt.astimezone(timezone.utc).timestamp() * 1000)
+
+
+def from_epoch_ms(ms):
+    """Naive local (fridge) datetime for epoch milliseconds."""
+    utc = datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+    return utc.astimezone(ZoneInfo(config.LOCAL_TIMEZONE)).replace(tzinfo=None)
+
+
+def timestamp_literal(dt):
+    """A Timestream timestamp expression for a datetime or epoch milliseconds."""
+    ms = dt if isinstance(dt, int) else to_epoch_ms(dt)
+    return f"from_milliseconds({ms})"
+
+
+def time_between(start, end):
+    """Predicate selecting rows with start <= time <= end."""
+    return f"time BETWEEN {timestamp_literal(start)} AND {timestamp_literal(end)}"
+
+
+def time_since(hours):
+    """Predicate selecting rows from the last ``hours`` hours."""
+    return f"time > ago({int(hours)}h)"
+
+
+def equals(column, value):
+    return f"{column} = {quote_literal(value)}"
+
+
+def in_list(column, values):
+    return f"{column} IN ({', '.join(quote_literal(v) for v in sorted(set(values)))})"
+
+
+# -- Query text ---------------------------------------------------------------
+# Quoted literals and identifiers, which must reach the server byte for byte
+_QUOTED = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")""")
+
+
+def _canonical(text):
+    """Collapse whitespace in builder-written SQL, leaving quoted text untouched."""
+    parts = _QUOTED.split(str(text))
+    # split() with a capture group puts the quoted pieces at odd positions
+    parts[::2] = [re.sub(r"\s+", " ", part) for part in parts[::2]]
+    return "".join(parts).strip()
+
+
+def select_query(columns, time_predicate, where=(), group_by=(), order_by=(), limit=None):
+    """
+    Build a canonical SELECT against the measure table.
+
+    ``time_predicate`` is required and always comes first in the WHERE clause;
+    use time_between() or time_since() to build it.
+    """
+    if not time_predicate or not _canonical(time_predicate).startswith("time "):
+        raise ValueError("Queries on the measure table need a time range predicate.")
+
+    parts = [
+        "SELECT " + ", ".join(_canonical(c) for c in columns),
+        "FROM " + table_ref(),
+        "WHERE " + " AND ".join(_canonical(p) for p in (time_predicate, *where)),
+    ]
+    if group_by:
+        parts.append("GROUP BY " + ", ".join(_canonical(g) for g in group_by))
+    if order_by:
+        parts.append("ORDER BY " + ", ".join(_canonical(o) for o in order_by))
+    if limit is not None:
+        parts.append(f"LIMIT {int(limit)}")
+    return " ".join(parts)
@@ -0,0 +1,106 @@
+# utils/registry.py
+# Fridge registry loaded from config.FRIDGE_REGISTRY_PATH (CSV), with a
+# uniform-grid spatial index so radius lookups only look at sites in nearby
+# cells instead of scanning the whole fleet.
+import math
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import config
+
+_EARTH_RADIUS_KM = 6371.0088
+_KM_PER_DEGREE_LAT = 111.32
+_REQUIRED_COLUMNS = ["number", "fridge_id", "address", "lat", "lon"]
+_REPO_ROOT = Path(__file__).resolve().parent.parent
+
+_registry = None
+_registry_key = None
+_registry_lock = threading.Lock()
+
+
+class FridgeRegistry:
+    """Registered sites (number, fridge_id, address, lat, lon) and their grid index."""
+
+    def __init__(self, sites, cell_degrees=None):
+        missing = [c for c in _REQUIRED_COLUMNS if c not in sites.columns]
+        if missing:
+            raise ValueError(f"Fridge registry is missing columns: {', '.join(missing)}")
+        duplicated = sites["fridge_id"][sites["fridge_id"].duplicated()].tolist()
+        if duplicated:
+            raise ValueError(f"Duplicate fridge ids in registry: {', '.join(duplicated[:5])}")
+
+        self.sites = sites[_REQUIRED_COLUMNS].reset_index(drop=True)
+        self.cell = cell_degrees or config.REGISTRY_GRID_DEGREES
+        self._lat = self.sites["lat"].to_numpy(dtype=float)
+        self._lon = self.sites["lon"].to_numpy(dtype=float)
+
+        self.options = dict(zip(self.sites["number"].tolist(), self.sites["fridge_id"].tolist()))
+        self.locations = dict(zip(self.sites["fridge_id"].tolist(), self.sites["address"].tolist()))
+        self.coordinates = {
+            fid: (lat, lon)
+            for fid, lat, lon in zip(self.sites["fridge_id"].tolist(), self._lat.tolist(), self._lon.tolist())
+        }
+
+        # (row cell, column cell) -> positions of the sites in that cell
+        rows = np.floor(self._lat / self.cell).astype(np.int64)
+        cols = np.floor(self._lon / self.cell).astype(np.int64)
+        self._cells = {
+            key: positions.to_numpy()
+            for key, positions in pd.Series(np.arange(len(self.sites))).groupby([rows, cols])
+        }
+
+    def __len__(self):
+        return len(self.sites)
+
+    def _candidates(self, south, west, north, east):
+        """Positions of the sites in every grid cell overlapping a bounding box."""
+        row_range = range(math.floor(south / self.cell), math.floor(north / self.cell) + 1)
+        col_range = range(math.floor(west / self.cell), math.floor(east / self.cell) + 1)
+        if len(row_range) * len(col_range) > len(self._cells):
+            return np.arange(len(self.sites))
+        found = [self._cells[(r, c)] for r in row_range for c in col_range if (r, c) in self._cells]
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+    def within_radius(self, lat, lon, radius_km):
+        """Sites within ``radius_km`` of a point, nearest first, with a distance_km column."""
+        dlat = radius_km / _KM_PER_DEGREE_LAT
+        dlon = radius_km / (_KM_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 1e-6))
+        pos = self._candidates(lat - dlat, lon - dlon, lat + dlat, lon + dlon)
+
+        phi1, phi2 = math.radians(lat), np.radians(self._lat[pos])
+        dphi = phi2 - phi1
+        dlambda = np.radians(self._lon[pos] - lon)
+        a = np.sin(dphi / 2) ** 2 + math.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+        distance = 2 * _EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+        inside = distance <= radius_km
+        order = np.argsort(distance[inside], kind="stable")
+        nearby = self.sites.iloc[pos[inside][order]].copy()
+        nearby["distance_km"] = distance[inside][order]
+        return nearby
+
+
+def load_registry(path):
+    """Read a registry CSV (number, fridge_id, address, lat, lon)."""
+    sites = pd.read_csv(path, dtype={"fridge_id": str, "address": str})
+    return FridgeRegistry(sites)
+
+
+def get_registry():
+    """
+    The process-wide registry, reloaded when the registry file changes. A
+    relative FRIDGE_REGISTRY_PATH is taken from the repository root, not the
+    working directory.
+    """
+    global _registry, _registry_key
+    path = _REPO_ROOT / config.FRIDGE_REGISTRY_PATH
+    key = (path, os.path.getmtime(path))
+    with _registry_lock:
+        if key != _registry_key:
+            _registry = load_registry(path)
+            _registry_key = key
+        return _registry
@@ -0,0 +1,350 @@
+# utils/store.py
+# Local on-disk copy of raw fridge telemetry (SQLite). For each fridge we keep
+# the readings we have downloaded plus the contiguous range they cover: its
+# start, and the end of the last completed fetch (the high-water mark).
+# Hourly and daily rollups (count/sum/min/max per bucket) are kept alongside
+# for long windows and summary stats; they are fetched in epoch-aligned
+# slices, and every complete slice fetched is recorded so it is never
+# requested again.
+import os
+import sqlite3
+import threading
+from contextlib import closing
+
+import pandas as pd
+
+import config
+
+_lock = threading.RLock()
+_fridge_locks = {}
+_initialized_path = None
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS readings (
+    fridge_id  TEXT    NOT NULL,
+    time_ns    INTEGER NOT NULL,
+    est_time   TEXT,
+    temp       REAL,
+    door_usage REAL,
+    region     TEXT,
+    PRIMARY KEY (fridge_id, time_ns)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS coverage (
+    fridge_id  TEXT PRIMARY KEY,
+    start_ns   INTEGER NOT NULL,
+    fetched_ns INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS rollups (
+    fridge_id  TEXT    NOT NULL,
+    grain_s    INTEGER NOT NULL,
+    start_ns   INTEGER NOT NULL,
+    samples    INTEGER NOT NULL,
+    temp_count INTEGER NOT NULL,
+    temp_sum   REAL,
+    temp_min   REAL,
+    temp_max   REAL,
+    door_count INTEGER NOT NULL,
+    door_sum   REAL,
+    door_max   REAL,
+    PRIMARY KEY (fridge_id, grain_s, start_ns)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS rollup_slices (
+    fridge_id TEXT    NOT NULL,
+    start_ns  INTEGER NOT NULL,
+    PRIMARY KEY (fridge_id, start_ns)
+) WITHOUT ROWID;
+"""
+
+HOUR_S = 3600
+DAY_S = 86400
+_NS_PER_S = 1_000_000_000
+
+# Per-bucket aggregates, as returned by the hourly Timestream rollup query
+_ROLLUP_FIELDS = [
+    "samples", "temp_count", "temp_sum", "temp_min", "temp_max",
+    "door_count", "door_sum", "door_max",
+]
+
+_COLUMNS = ["est_time", "temp", "door_usage", "fridge_id", "region", "time"]
+
+
+def _connect():
+    """Open a connection to the store, creating the schema on first use."""
+    global _initialized_path
+    path = config.LOCAL_STORE_PATH
+    if _initialized_path != path:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    if _initialized_path != path:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(coverage)")}
+        if "fetched_ns" not in columns:
+            conn.execute("ALTER TABLE coverage ADD COLUMN fetched_ns INTEGER")
+        _initialized_path = path
+    return conn
+
+
+def fridge_lock(fridge_id):
+    """Process-wide lock to hold while syncing one fridge with Timestream."""
+    with _lock:
+        return _fridge_locks.setdefault(fridge_id, threading.Lock())
+
+
+def _nullable(series):
+    """Series values as a list with NaN/NA mapped to None for sqlite."""
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def get_coverage_start(fridge_id):
+    """Start (epoch ns) of the range held locally for a fridge, or None."""
+    with _lock, closing(_connect()) as conn:
+        row = conn.execute(
+            "SELECT start_ns FROM coverage WHERE fridge_id = ?", (fridge_id,)
+        ).fetchone()
+    return row[0] if row else None
+
+
+def get_watermark(fridge_id):
+    """
+    End (epoch ns) of the range fetched for a fridge, or None. Stores written
+    before the mark was kept fall back to the newest stored reading.
+    """
+    with _lock, closing(_connect()) as conn:
+        row = conn.execute(
+            "SELECT coalesce("
+            "(SELECT fetched_ns FROM coverage WHERE fridge_id = ?), "
+            "(SELECT max(time_ns) FROM readings WHERE fridge_id = ?))",
+            (fridge_id, fridge_id),
+        ).fetchone()
+    return row[0] if row else None
+
+
+def append_readings(fridge_id, df, covered_from_ns=None, fetched_to_ns=None):
+    """
+    Upsert parsed raw readings for a fridge.
+
+    ``covered_from_ns`` extends the locally covered range back to that time
+    (used after a backfill) and ``fetched_to_ns`` moves the watermark up to
+    that time (once a fetch has completed); rows already present are replaced.
+    """
+    with _lock, closing(_connect()) as conn, conn:
+        if df is not None and not df.empty:
+            rows = zip(
+                df["time"].astype("int64").tolist(),
+                _nullable(df["est_time"]),
+                _nullable(df["temp"]),
+                _nullable(df["door_usage"]),
+                _nullable(df["region"]),
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO readings "
+                "(fridge_id, time_ns, est_time, temp, door_usage, region) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                ((fridge_id, *row) for row in rows),
+            )
+        if covered_from_ns is not None:
+            conn.execute(
+                "INSERT INTO coverage (fridge_id, start_ns) VALUES (?, ?) "
+                "ON CONFLICT(fridge_id) DO UPDATE SET start_ns = min(start_ns, excluded.start_ns)",
+                (fridge_id, int(covered_from_ns)),
+            )
+        if fetched_to_ns is not None:
+            conn.execute(
+                "UPDATE coverage SET fetched_ns = max(coalesce(fetched_ns, ?), ?) WHERE fridge_id = ?",
+                (int(fetched_to_ns), int(fetched_to_ns), fridge_id),
+            )
+
+
+def read_readings(fridge_id, start_ns, end_ns):
+    """Stored readings for a fridge with start <= time <= end, newest first."""
+    with _lock, closing(_connect()) as conn:
+        df = pd.read_sql_query(
+            "SELECT est_time, temp, door_usage, fridge_id, region, time_ns "
+            "FROM readings WHERE fridge_id = ? AND time_ns BETWEEN ? AND ? "
+            "ORDER BY time_ns DESC",
+            conn,
+            params=(fridge_id, int(start_ns), int(end_ns)),
+        )
+    df["time"] = pd.to_datetime(df.pop("time_ns"), unit="ns")
+    return df[_COLUMNS]
+
+
+def prune(fridge_id, older_than_ns):
+    """Drop readings older than a cutoff and shrink the covered range to match."""
+    with _lock, closing(_connect()) as conn, conn:
+        conn.execute(
+            "DELETE FROM readings WHERE fridge_id = ? AND time_ns < ?",
+            (fridge_id, int(older_than_ns)),
+        )
+        conn.execute(
+            "UPDATE coverage SET start_ns = ? WHERE fridge_id = ? AND start_ns < ?",
+            (int(older_than_ns), fridge_id, int(older_than_ns)),
+        )
+
+
+# -- Rollups ------------------------------------------------------------------
+def get_rollup_slices(fridge_id, start_ns, end_ns):
+    """Starts (epoch ns) of the complete rollup slices stored in a range."""
+    with _lock, closing(_connect()) as conn:
+        rows = conn.execute(
+            "SELECT start_ns FROM rollup_slices WHERE fridge_id = ? AND start_ns BETWEEN ? AND ?",
+            (fridge_id, int(start_ns), int(end_ns)),
+        ).fetchall()
+    return {row[0] for row in rows}
+
+
+def get_rollup_watermark(fridge_id):
+    """Start (epoch ns) of the newest hourly rollup of a fridge, or None."""
+    with _lock, closing(_connect()) as conn:
+        row = conn.execute(
+            "SELECT max(start_ns) FROM rollups WHERE fridge_id = ? AND grain_s = ?",
+            (fridge_id, HOUR_S),
+        ).fetchone()
+    return row[0] if row else None
+
+
+def append_hourly_rollups(fridge_id, df, complete_slice_ns=None):
+    """
+    Upsert hourly rollups (``time`` plus the _ROLLUP_FIELDS columns) and
+    recompute the daily rollups of every day they touch.
+
+    ``complete_slice_ns`` records the slice these rows complete, if any.
+    """
+    with _lock, closing(_connect()) as conn, conn:
+        if df is not None and not df.empty:
+            starts = df["time"].astype("int64")
+            rows = zip(starts.tolist(), *(_nullable(df[name]) for name in _ROLLUP_FIELDS))
+            conn.executemany(
+                "INSERT OR REPLACE INTO rollups "
+                f"(fridge_id, grain_s, start_ns, {', '.join(_ROLLUP_FIELDS)}) "
+                f"VALUES (?, ?, ?, {', '.join('?' * len(_ROLLUP_FIELDS))})",
+                ((fridge_id, HOUR_S, *row) for row in rows),
+            )
+
+            day_ns = DAY_S * _NS_PER_S
+            conn.execute(
+                "INSERT OR REPLACE INTO rollups "
+                f"(fridge_id, grain_s, start_ns, {', '.join(_ROLLUP_FIELDS)}) "
+                "SELECT fridge_id, ?, start_ns / ? * ?, sum(samples), sum(temp_count), "
+                "sum(temp_sum), min(temp_min), max(temp_max), sum(door_count), "
+                "sum(door_sum), max(door_max) "
+                "FROM rollups WHERE fridge_id = ? AND grain_s = ? AND start_ns BETWEEN ? AND ? "
+                "GROUP BY start_ns / ?",
+                (
+                    DAY_S, day_ns, day_ns, fridge_id, HOUR_S,
+                    int(starts.min()) // day_ns * day_ns,
+                    int(starts.max()) // day_ns * day_ns + day_ns - 1,
+                    day_ns,
+                ),
+            )
+        if complete_slice_ns is not None:
+            conn.execute(
+                "INSERT OR IGNORE INTO rollup_slices (fridge_id, start_ns) VALUES (?, ?)",
+                (fridge_id, int(complete_slice_ns)),
+            )
+
+
+def read_rollup_bins(fridge_id, start_ns, end_ns, bin_width):
+    """
+    Rollups re-aggregated into epoch-aligned bins of ``bin_width`` seconds
+    (a multiple of an hour), newest first, shaped like binned history:
+    time, temp (mean), temp_min, temp_max, door_usage (total), door_max, samples.
+    """
+    grain = DAY_S if bin_width % DAY_S == 0 else HOUR_S
+    bin_ns = bin_width * _NS_PER_S
+    with _lock, closing(_connect()) as conn:
+        df = pd.read_sql_query(
+            "SELECT start_ns / ? * ? AS time_ns, "
+            "sum(temp_sum) / sum(temp_count) AS temp, min(temp_min) AS temp_min, "
+            "max(temp_max) AS temp_max, sum(door_sum) AS door_usage, "
+            "max(door_max) AS door_max, sum(samples) AS samples "
+            "FROM rollups WHERE fridge_id = ? AND grain_s = ? AND start_ns BETWEEN ? AND ? "
+            "GROUP BY 1 ORDER BY 1 DESC",
+            conn,
+            params=(bin_ns, bin_ns, fridge_id, grain, int(start_ns), int(end_ns)),
+        )
+    df.insert(0, "time", pd.to_datetime(df.pop("time_ns"), unit="ns"))
+    return df
+
+
+_TOTALS = ["temp_sum", "temp_count", "temp_min", "temp_max", "door_sum", "door_count", "door_max"]
+
+
+def rollup_totals(fridge_id, start_ns, end_ns):
+    """
+    Sums, counts and extremes over the whole hours in [start_ns, end_ns)
+    (both hour-aligned): whole days come from daily rollups, the hours at
+    either edge from hourly ones.
+    """
+    day_ns = DAY_S * _NS_PER_S
+    start_ns, end_ns = int(start_ns), int(end_ns)
+    days_from = -(-start_ns // day_ns) * day_ns
+    days_to = end_ns // day_ns * day_ns
+    if days_from >= days_to:
+        days_from = days_to = end_ns
+
+    with _lock, closing(_connect()) as conn:
+        row = conn.execute(
+            "SELECT sum(temp_sum), sum(temp_count), min(temp_min), max(temp_max), "
+            "sum(door_sum), sum(door_count), max(door_max) FROM rollups "
+            "WHERE fridge_id = ? AND ("
+            "(grain_s = ? AND start_ns >= ? AND start_ns < ?) OR "
+            "(grain_s = ? AND ((start_ns >= ? AND start_ns < ?) OR (start_ns >= ? AND start_ns < ?))))",
+            (fridge_id, DAY_S, days_from, days_to,
+             HOUR_S, start_ns, days_from, days_to, end_ns),
+        ).fetchone()
+    return dict(zip(_TOTALS, row))
+
+
+def reading_totals(df):
+    """The rollup_totals fields computed from raw readings."""
+    temp, door = df["temp"].astype(float), df["door_usage"].astype(float)
+    return {
+        "temp_sum": temp.sum(), "temp_count": int(temp.count()),
+        "temp_min": temp.min(), "temp_max": temp.max(),
+        "door_sum": door.sum(), "door_count": int(door.count()), "door_max": door.max(),
+    }
+
+
+def summarize_totals(parts):
+    """
+    Combine rollup_totals/reading_totals of disjoint ranges into summary
+    stats: temp_avg/max/min, door_total/max/avg. None when there is no data.
+    """
+    def values(key):
+        return [p[key] for p in parts if p[key] is not None and not pd.isna(p[key])]
+
+    temp_count, door_count = sum(values("temp_count")), sum(values("door_count"))
+    if not temp_count and not door_count:
+        return None
+    temp_sum, door_sum = sum(values("temp_sum")), sum(values("door_sum"))
+    return {
+        "temp_avg": temp_sum / temp_count if temp_count else None,
+        "temp_max": max(values("temp_max"), default=None),
+        "temp_min": min(values("temp_min"), default=None),
+        "door_total": int(door_sum),
+        "door_max": int(max(values("door_max"), default=0)),
+        "door_avg": door_sum / door_count if door_count else None,
+    }
+
+
+def prune_rollups(fridge_id, older_than_ns):
+    """Drop rollups, and the slices recorded for them, starting before a cutoff."""
+    with _lock, closing(_connect()) as conn, conn:
+        for table in ("rollups", "rollup_slices"):
+            conn.execute(
+                f"DELETE FROM {table} WHERE fridge_id = ? AND start_ns < ?",
+                (fridge_id, int(older_than_ns)),
+            )
+
+
+def clear(fridge_id=None):
+    """Forget stored readings, rollups and coverage for one fridge, or for all fridges."""
+    where, params = ("WHERE fridge_id = ?", (fridge_id,)) if fridge_id else ("", ())
+    with _lock, closing(_connect()) as conn, conn:
+        for table in ("readings", "coverage", "rollups", "rollup_slices"):
+            conn.execute(f"DELETE FROM {table} {where}", params)
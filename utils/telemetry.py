@@ -0,0 +1,116 @@
+# utils/telemetry.py
+# Query and cache instrumentation. Every Timestream query records its latency,
+# page count, rows and bytes scanned/metered; every tracked st.cache_data layer
+# counts calls and misses. Records are logged as JSON and kept in memory for
+# the diagnostics panel.
+import functools
+import json
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_recent_queries = deque(maxlen=500)
+_cache_stats = {}
+_listeners = []
+
+
+@dataclass
+class QueryStats:
+    label: str
+    query_id: Optional[str] = None
+    session_id: Optional[str] = None
+    started_at: float = field(default_factory=time.time)
+    latency_ms: float = 0.0
+    pages: int = 0
+    rows: int = 0
+    bytes_scanned: int = 0
+    bytes_metered: int = 0
+    error: Optional[str] = None
+
+
+def current_session_id():
+    """Streamlit session id of the calling thread (None for background work)."""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx else None
+
+
+def add_listener(callback):
+    """Call ``callback(stats)`` for every finished query (e.g. the cost governor)."""
+    with _lock:
+        _listeners.append(callback)
+
+
+def record_query(stats):
+    """Store and log a finished query."""
+    with _lock:
+        _recent_queries.append(stats)
+        listeners = list(_listeners)
+    logger.info("timestream_query %s", json.dumps(asdict(stats)))
+    for callback in listeners:
+        try:
+            callback(stats)
+        except Exception:
+            logger.exception("Query listener failed")
+
+
+def recent_queries():
+    with _lock:
+        return list(_recent_queries)
+
+
+# -- Cache accounting ---------------------------------------------------------
+def _count(name, key):
+    with _lock:
+        stats = _cache_stats.setdefault(name, {"calls": 0, "misses": 0})
+        stats[key] += 1
+
+
+def count_cache_lookup(name, hit):
+    """Count one lookup of a hand-rolled cache (see utils.buckets)."""
+    _count(name, "calls")
+    if not hit:
+        _count(name, "misses")
+
+
+def cache_stats():
+    """{name: {"calls", "misses", "hits", "hit_rate"}} for every tracked cache."""
+    with _lock:
+        snapshot = {name: dict(stats) for name, stats in _cache_stats.items()}
+    for stats in snapshot.values():
+        stats["hits"] = stats["calls"] - stats["misses"]
+        stats["hit_rate"] = stats["hits"] / stats["calls"] if stats["calls"] else None
+    return snapshot
+
+
+def tracked_cache_data(name, **cache_kwargs):
+    """
+    ``st.cache_data`` that also counts calls and misses under ``name``.
+
+    The wrapped body only runs on a miss, so hits = calls - misses.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def on_miss(*args, **kwargs):
+            _count(name, "misses")
+            logger.debug("cache_miss %s", name)
+            return fn(*args, **kwargs)
+
+        cached = st.cache_data(**cache_kwargs)(on_miss)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            _count(name, "calls")
+            return cached(*args, **kwargs)
+
+        wrapper.clear = cached.clear
+        return wrapper
+    return decorator